@@ -0,0 +1,81 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from response_cache import normalize_text
+
+
+class AnswerStore:
+    """Pre-generated answers for fixed questions, persisted as a JSON file.
+
+    Answers are keyed by (kind, language, normalized question), where kind
+    is the endpoint whose prompt produced them ('chat' or 'search'). A file
+    built for another prompt_version is ignored on load, so answers never
+    outlive a prompt change.
+    """
+
+    def __init__(self, prompt_version, answers=None, meta=None):
+        self.prompt_version = prompt_version
+        self.meta = meta or {}
+        self._answers = answers or {}
+        self._lock = threading.Lock()
+        self.hits = 0
+
+    @staticmethod
+    def _key(kind, language, question):
+        return f"{kind}|{language.lower()}|{normalize_text(question)}"
+
+    @classmethod
+    def load(cls, path, prompt_version):
+        """Read the store from path; a missing or stale file gives an empty store"""
+        try:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return cls(prompt_version)
+        if data.get('prompt_version') != prompt_version:
+            return cls(prompt_version, meta={'stale_file': path})
+        answers = {
+            cls._key(entry['kind'], entry['language'], entry['question']): entry['answer']
+            for entry in data.get('answers', [])
+        }
+        meta = {k: v for k, v in data.items() if k != 'answers'}
+        return cls(prompt_version, answers, meta)
+
+    def get(self, kind, language, question):
+        answer = self._answers.get(self._key(kind, language, question))
+        if answer is not None:
+            with self._lock:
+                self.hits += 1
+        return answer
+
+    def items(self, kind):
+        """(language, normalized question, answer) for every answer of one kind"""
+        for key, answer in self._answers.items():
+            entry_kind, language, question = key.split('|', 2)
+            if entry_kind == kind:
+                yield language, question, answer
+
+    def __len__(self):
+        return len(self._answers)
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits
+        return dict(self.meta, answers=len(self._answers), hits=hits)
+
+
+def write_answer_file(path, prompt_version, entries, **meta):
+    """Atomically write {kind, language, question, answer} entries for AnswerStore.load"""
+    data = dict(meta, prompt_version=prompt_version, generated_at=time.strftime('%Y-%m-%dT%H:%M:%S'))
+    data['answers'] = entries
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
@@ -1,16 +1,49 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-import google.generativeai as genai
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
+import logging
+import time
+import json
 from dotenv import load_dotenv
 import traceback
-import time
+import hashlib
+import math
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
 import re
-import serpapi
+from response_cache import ResponseCache, normalize_text
+from job_queue import GenerationJobQueue, JobQueueFull, create_job_store, is_rate_limit_error
+from scam_detector import ScamDetector
+from keyword_index import KeywordIndex
+from singleflight import SingleFlight
+from conversation import ContextBuilder
+from session_store import SessionExpired, create_session_store
+from model_router import ModelRouter
+from lazy_client import LazyClient
+from quota_limiter import SharedQuota
+from circuit_breaker import CircuitBreaker, CircuitOpenError
+from deadline import Deadline
+from answer_store import AnswerStore
+from question_index import QuestionIndex
+from metrics import HistogramFamily
+from structured_log import configure_logging, log_event, logging_stats
+from response_encoding import (
+    MINIMAL_FIELDS, Compressor, compact_body, compress, dump_compact, encode_chunks, negotiate_encoding,
+    requested_fields
+)
+
+STARTED_AT = time.monotonic()
 
 # Load environment variables
 load_dotenv()
 
+# Structured JSON logs, written by a background thread. Per-request events
+# are sampled (LOG_SAMPLE_RATE); warnings and errors are always kept.
+configure_logging(
+    sample_rate=float(os.getenv('LOG_SAMPLE_RATE', 0.1)),
+    level=os.getenv('LOG_LEVEL', 'INFO').upper()
+)
+
 app = Flask(__name__)
 # Allow the deployed frontend origins (Next.js on Vercel/local) and the
 # GitHub Pages site used for the voice client. Keep this list strict in
@@ -21,6 +54,13 @@ allowed_origins = [
     "https://rishavkr43.github.io/Finstra/Frontend_vc/index.html"
 ]
 CORS(app, resources={r"/api/*": {"origins": allowed_origins}})
+# Hindi/Bengali text as UTF-8 (3 bytes a character) instead of \uXXXX escapes (6)
+app.json.ensure_ascii = False
+# request.remote_addr is the address Railway's proxy saw, taken from the
+# X-Forwarded-For hop it appended. Hops before it are set by the client.
+TRUSTED_PROXY_HOPS = int(os.getenv('TRUSTED_PROXY_HOPS', 1))
+if TRUSTED_PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXY_HOPS)
 
 # Configure Gemini API
 api_key = os.getenv('GEMINI_API_KEY')
@@ -28,19 +68,320 @@ serpapi_key = os.getenv('SERPAPI_API_KEY')  # Updated env var name to standard f
 port = int(os.getenv('PORT', 5000))  # For Railway deployment
 
 if not api_key:
-    print("WARNING: GEMINI_API_KEY not found in environment variables!")
+    log_event('gemini_api_key_missing', level=logging.WARNING)
 else:
-    print("API key loaded successfully")
+    log_event('gemini_api_key_loaded')
+
+# Models in preference order: the first is the primary, the others are
+# hedge and failover targets for the router.
+GEMINI_MODELS = [
+    name.strip()
+    for name in os.getenv('GEMINI_MODELS', 'models/gemini-2.5-flash-lite,models/gemini-2.0-flash-lite').split(',')
+    if name.strip()
+]
+
+# Gemini requests per minute to each model in GEMINI_MODELS, matching
+# Gemini's per-model quotas, shared by all worker processes through a local
+# SQLite file (0 disables the limiter). Hedges and failover spend the other
+# models' budgets, so the deployment as a whole can send up to
+# len(GEMINI_MODELS) x GEMINI_RPM. Each client gets at most GEMINI_CLIENT_RPM
+# (default a quarter of GEMINI_RPM), counted once per request.
+GEMINI_RPM = int(os.getenv('GEMINI_RPM', 0))
+gemini_quota = SharedQuota(
+    os.getenv('GEMINI_QUOTA_DB', 'gemini_quota.db'),
+    rpm=GEMINI_RPM,
+    burst=int(os.getenv('GEMINI_BURST', 0)) or None,
+    client_rpm=int(os.getenv('GEMINI_CLIENT_RPM', 0)) or None,
+    cooldown=float(os.getenv('GEMINI_QUOTA_COOLDOWN', 5))
+) if GEMINI_RPM > 0 else None
+
+def build_model_router():
+    # google.generativeai takes most of this module's import time, so it is
+    # imported on first use rather than on every cold start
+    import google.generativeai as genai
+    genai.configure(api_key=api_key)
+    try:
+        router = ModelRouter(
+            [genai.GenerativeModel(name) for name in GEMINI_MODELS],
+            default_hedge_delay=float(os.getenv('HEDGE_DEFAULT_DELAY', 4)),
+            min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', 20)),
+            limiter=gemini_quota,
+            max_quota_wait=float(os.getenv('GEMINI_QUOTA_MAX_WAIT', 2))
+        )
+    except Exception as e:
+        log_event('model_init_failed', level=logging.ERROR, error=str(e))
+        raise Exception("Failed to initialize the model!")
+    log_event('models_initialized', models=GEMINI_MODELS)
+    return router
+
+def build_serpapi_client():
+    import serpapi
+    return serpapi.Client(api_key=serpapi_key)
+
+# Gemini and SerpAPI clients, built on first use in each worker process
+model = LazyClient('gemini', build_model_router)
+serpapi_client = LazyClient('serpapi', build_serpapi_client)
+
+# Latency histograms served at /api/py/metrics. Stage spans cover the steps
+# of the chat and voice search pipelines; request spans cover whole requests,
+# except that a stream's ends with its headers (stream_response times the rest).
+stage_latency = HistogramFamily(
+    'finstra_stage_duration_seconds',
+    'Time spent in each stage of a request.',
+    ('endpoint', 'stage')
+)
+request_latency = HistogramFamily(
+    'finstra_request_duration_seconds',
+    'Time to produce the response (until the headers for streams; see their first_chunk and llm_call stages).',
+    ('endpoint',)
+)
+
+def render_quota_metrics():
+    """This worker's shared-budget counters, if the limiter is enabled"""
+    if gemini_quota is None:
+        return ""
+    stats = gemini_quota.stats()
+    lines = []
+    for name, help_text in (
+        ('granted', 'Gemini requests let through by the shared budget.'),
+        ('denied', 'Budget checks that found no token (the caller waited, used another model or gave up).'),
+        ('rate_limited', '429s from Gemini reported to the shared budget.'),
+    ):
+        lines += [
+            f"# HELP finstra_gemini_quota_{name}_total {help_text}",
+            f"# TYPE finstra_gemini_quota_{name}_total counter",
+            f"finstra_gemini_quota_{name}_total {stats[name]}",
+        ]
+    return "\n".join(lines) + "\n"
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    return (
+        stage_latency.render()
+        + request_latency.render()
+        + "# HELP finstra_log_records_dropped_total Log records dropped because the log queue was full.\n"
+        + "# TYPE finstra_log_records_dropped_total counter\n"
+        + f"finstra_log_records_dropped_total {logging_stats()['dropped']}\n"
+        + render_quota_metrics()
+    )
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def observe_request_latency(response):
+    if request.endpoint and 'request_start' in g:
+        request_latency.observe(time.perf_counter() - g.request_start, request.endpoint)
+    return response
+
+# Low-bandwidth mode for /api/py/*: bodies are gzip/brotli encoded when the
+# client accepts it and they are at least COMPRESS_MIN_BYTES (smaller ones
+# gain little and cost CPU), and trimmed to the fields a client asks for
+# with ?fields=a,b or "Prefer: return=minimal".
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 512))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+# Only answer-bearing routes are trimmed. common-questions is shared-cached
+# under one ETag and the ops endpoints are read whole, so they always get
+# the full body.
+TRIMMABLE_ENDPOINTS = frozenset([
+    'voice_search', 'voice_search_stream', 'chat', 'chat_stream', 'chat_batch', 'get_job'
+])
+
+def trimmed_fields(endpoint, fields_param, prefer_header):
+    """requested_fields for a trimmable endpoint, None (the whole body) for the rest"""
+    if endpoint not in TRIMMABLE_ENDPOINTS:
+        return None
+    return requested_fields(fields_param, prefer_header)
+
+def negotiated_encoding(response, accept_encoding, streaming):
+    """Content coding to apply to this response, or None"""
+    if response.status_code in (204, 304) or 'Content-Encoding' in response.headers:
+        return None
+    return negotiate_encoding(accept_encoding, streaming)
+
+@app.after_request
+def encode_api_response(response):
+    if not request.path.startswith('/api/py/') or response.direct_passthrough:
+        return response
+    fields = trimmed_fields(request.endpoint, request.args.get('fields'), request.headers.get('Prefer'))
+    if fields is MINIMAL_FIELDS:
+        response.headers['Preference-Applied'] = 'return=minimal'
+    if request.endpoint in TRIMMABLE_ENDPOINTS:
+        response.vary.add('Prefer')
+    response.vary.add('Accept-Encoding')
+    encoding = negotiated_encoding(response, request.headers.get('Accept-Encoding'), response.is_streamed)
+
+    if response.is_streamed:
+        # SSE and NDJSON: every chunk is flushed so events are not held back
+        compressor = Compressor(encoding, GZIP_LEVEL, BROTLI_QUALITY) if encoding else None
+        if fields is not None or compressor is not None:
+            response.response = encode_chunks(response.response, fields, compressor)
+        if compressor is not None:
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+        return response
+
+    if fields is not None and response.is_json:
+        response.set_data(dump_compact(compact_body(response.get_json(), fields)))
+    data = response.get_data()
+    if encoding and len(data) >= COMPRESS_MIN_BYTES:
+        response.set_data(compress(data, encoding, GZIP_LEVEL, BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+# In-process cache for generated answers. Bump PROMPT_VERSION whenever
+# SYSTEM_PROMPT or the per-endpoint templates change so stale answers are
+# not served for the new prompt.
+PROMPT_VERSION = '1'
+response_cache = ResponseCache(
+    max_entries=int(os.getenv('RESPONSE_CACHE_SIZE', 512)),
+    ttl_seconds=int(os.getenv('RESPONSE_CACHE_TTL', 3600))
+)
+
+# Identical prompts in flight at the same time (a common question tapped by
+# many users at once) share one generate_content call.
+generation_flight = SingleFlight()
+
+# An upstream that fails BREAKER_FAILURES times in a row is not called for
+# BREAKER_RESET seconds: requests fail fast (Gemini) or go without it
+# (SerpAPI) instead of each one waiting out its timeout.
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 5))
+BREAKER_RESET = float(os.getenv('BREAKER_RESET', 30))
+gemini_breaker = CircuitBreaker('Gemini', BREAKER_FAILURES, BREAKER_RESET)
+serpapi_breaker = CircuitBreaker('SerpAPI', BREAKER_FAILURES, BREAKER_RESET)
+
+def client_key(forwarded_for, remote_addr):
+    """Client identity for the per-client budget, as ProxyFix(x_for=TRUSTED_PROXY_HOPS) resolves it.
+
+    That is the X-Forwarded-For hop appended by the outermost trusted
+    proxy, counting from the right; earlier hops come from the client and
+    could be changed on every request. Without enough hops, the peer.
+    """
+    hops = [hop.strip() for hop in (forwarded_for or '').split(',') if hop.strip()]
+    if TRUSTED_PROXY_HOPS and len(hops) >= TRUSTED_PROXY_HOPS:
+        return hops[-TRUSTED_PROXY_HOPS]
+    return remote_addr or 'unknown'
+
+def request_client():
+    # ProxyFix has already replaced remote_addr with the trusted hop
+    return request.remote_addr or 'unknown'
 
-genai.configure(api_key=api_key)
+def admit_client(client):
+    """Charge one Gemini request to client's share of the budget, or raise QuotaExceeded"""
+    if gemini_quota is not None and client:
+        gemini_quota.admit_client(client)
 
-# Initialize the model
-try:
-    model = genai.GenerativeModel('models/gemini-2.5-flash-lite')
-    print(f"Successfully initialized model: models/gemini-2.5-flash-lite")
-except Exception as e:
-    print(f"Failed to initialize model: {str(e)}")
-    raise Exception("Failed to initialize the model!")
+def is_queueable_rate_limit(error):
+    """Rate limits worth retrying on the job queue.
+
+    A client over its own share gets the 429 back instead, so queueing
+    cannot be used to get around it.
+    """
+    return is_rate_limit_error(error) and getattr(error, 'scope', None) != 'client'
+
+def retry_after_seconds(error):
+    """Whole seconds until a QuotaExceeded error clears, or None for other errors"""
+    retry_after = getattr(error, 'retry_after', None)
+    return math.ceil(retry_after) if retry_after is not None else None
+
+def error_status(error):
+    """HTTP status for a failed generation: 429 rate limited, 503 circuit open, 409 session expired, else 500"""
+    if isinstance(error, CircuitOpenError):
+        return 503
+    if isinstance(error, SessionExpired):
+        return 409
+    return 429 if '429' in str(error) else 500
+
+def rate_limit_headers(error):
+    retry_after = retry_after_seconds(error)
+    return {'Retry-After': str(retry_after)} if retry_after is not None else {}
+
+def is_gemini_outage(error, timeout=None):
+    """Errors that count against Gemini's circuit breaker.
+
+    Rate limits have their own backoff, and a timeout shorter than
+    LLM_MIN_BUDGET means the request ran out of time, not that Gemini is
+    slow.
+    """
+    if is_rate_limit_error(error) or isinstance(error, CircuitOpenError):
+        return False
+    if isinstance(error, TimeoutError) and timeout is not None:
+        return timeout >= LLM_MIN_BUDGET
+    return True
+
+def call_gemini(generative_model, prompt, timeout=None):
+    """One generate_content call with its outcome recorded on Gemini's breaker.
+
+    Runs once per shared generation, so coalesced callers do not count
+    the same failure several times.
+    """
+    options = {'timeout': timeout} if timeout is not None else {}
+    try:
+        text = generative_model.generate_content(prompt, **options).text
+    except Exception as e:
+        if is_gemini_outage(e, timeout):
+            gemini_breaker.record_failure()
+        raise
+    gemini_breaker.record_success()
+    return text
+
+def generate_text(prompt, generative_model=None, client=None, timeout=None):
+    """Generate text for a fully assembled prompt, coalescing concurrent identical calls.
+
+    client is charged for the call when the shared budget is enabled.
+    timeout bounds the wait, hedges included (TimeoutError past it): the
+    call itself gets the first caller's timeout, which ModelRouter
+    enforces, and callers that join it stop waiting at their own.
+    Raises CircuitOpenError while Gemini's breaker is open.
+    """
+    gemini_breaker.check()
+    admit_client(client)
+    generative_model = generative_model or model
+    key = response_cache.make_key(generative_model._model_name, prompt)
+    return generation_flight.do(key, lambda: call_gemini(generative_model, prompt, timeout), timeout=timeout)
+
+def coalescing_stats(flight):
+    """Singleflight counters, with the shared results reported as saved model calls"""
+    stats = flight.stats()
+    stats['calls_saved'] = stats.pop('shared')
+    return stats
+
+def _generate_text(prompt):
+    """Run one generation for a queued job, treating an empty answer as a failure"""
+    text = generate_text(prompt)
+    if not text:
+        raise ValueError("Sorry, I couldn't generate a response. Please try again.")
+    return text
+
+# Generations that hit the Gemini rate limit are retried in the background
+# instead of sleeping inside the request handler. With several workers set
+# JOB_STORE=sqlite so a poll can be answered by any of them.
+job_queue = GenerationJobQueue(
+    _generate_text,
+    workers=int(os.getenv('JOB_WORKERS', 2)),
+    max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', 5)),
+    base_delay=float(os.getenv('JOB_BASE_DELAY', 5)),
+    max_jobs=int(os.getenv('JOB_MAX_QUEUED', 1000)),
+    store=create_job_store()
+)
+
+def queue_generation(prompt, cache_key, payload, on_result=None):
+    """Queue a rate-limited generation whose cleaned result is also cached.
+
+    on_result(cleaned_text) runs once the job succeeds. Raises
+    JobQueueFull (a 429) when this worker already holds JOB_MAX_QUEUED.
+    """
+    def on_success(text):
+        cleaned_text = clean_response(text)
+        if cache_key:
+            response_cache.set(cache_key, cleaned_text)
+        if on_result:
+            on_result(cleaned_text)
+        return cleaned_text
+    return job_queue.submit(prompt, on_success=on_success, payload=payload)
 
 SYSTEM_PROMPT = """
 You are Finstra, a voice-based financial advisor for rural people.
@@ -67,15 +408,6 @@ IMPORTANT:
 
 """
 
-# Scam detection patterns
-SCAM_PATTERNS = [
-    r'(?i)(send money|transfer.*urgently|lottery.*won|prince.*nigeria|inheritance.*claim)',
-    r'(?i)(click.*link|verify.*account.*immediately|suspended.*account)',
-    r'(?i)(give.*otp|share.*pin|tell.*password|bank.*details)',
-    r'(?i)(investment.*guaranteed|double.*money|risk.*free.*profit)',
-    r'(?i)(crypto.*mining|bitcoin.*investment|forex.*trading.*sure)'
-]
-
 # Proactive suggestions
 PROACTIVE_SUGGESTIONS = {
     'savings': {
@@ -148,143 +480,887 @@ PROACTIVE_SUGGESTIONS = {
     }
 }
 
-def search_web(query: str) -> str:
-    """Helper function to search the web using SerpAPI"""
+# English + Hindi + Bengali keywords for each suggestion category, plus the
+# words that mark a real-time question needing a web lookup. Matching is on
+# word boundaries ('now' does not fire on 'know'); a trailing '*' allows
+# suffixes, which Bengali attaches directly to nouns (ব্যাংকে, লোনের).
+INTENT_KEYWORDS = {
+    'savings': ['save', 'saves', 'saving*', 'money', 'बचत', 'पैसे', 'पैसा', 'बचाना', 'बचाएं', 'টাকা*', 'সাশ্রয়*', 'সঞ্চয়*'],
+    'banking': ['bank*', 'account*', 'बैंक', 'खाता', 'खाते', 'बैंकिंग', 'ব্যাংক*', 'অ্যাকাউন্ট*'],
+    'loans': ['loan*', 'borrow*', 'credit', 'लोन', 'उधार', 'ऋण', 'লোন*', 'ঋণ*'],
+    'insurance': ['insurance', 'insure*', 'policy', 'policies', 'coverage', 'बीमा', 'पॉलिसी', 'বীমা*', 'পলিসি*'],
+    'realtime': [
+        'today', 'current*', 'latest', 'now', 'rate', 'rates', 'price*', 'update*', 'news',
+        'आज', 'ताजा', 'ताज़ा', 'भाव', 'दाम', 'कीमत', 'रेट', 'আজ*', 'দাম', 'বর্তমান', 'সর্বশেষ', 'খবর'
+    ]
+}
+
+SUGGESTION_CATEGORIES = ['savings', 'banking', 'loans', 'insurance']
+
+# One precompiled index feeds both the suggestion lookup and the web-search trigger
+keyword_index = KeywordIndex(INTENT_KEYWORDS)
+
+# SerpAPI lookups: a short-lived cache keyed on the normalized query, one
+# outbound call for concurrent identical queries, and a hard timeout after
+# which the answer is generated without the snippet.
+SERPAPI_TIMEOUT = float(os.getenv('SERPAPI_TIMEOUT', 4))
+
+# A voice search has VOICE_SEARCH_DEADLINE seconds end to end. The web
+# lookup gets what is left after reserving LLM_MIN_BUDGET for Gemini (at
+# most SERPAPI_TIMEOUT) and is skipped if that is under WEB_MIN_BUDGET;
+# Gemini gets the rest.
+VOICE_SEARCH_DEADLINE = float(os.getenv('VOICE_SEARCH_DEADLINE', 12))
+LLM_MIN_BUDGET = float(os.getenv('LLM_MIN_BUDGET', 6))
+WEB_MIN_BUDGET = float(os.getenv('WEB_MIN_BUDGET', 0.5))
+search_cache = ResponseCache(
+    max_entries=int(os.getenv('SERPAPI_CACHE_SIZE', 256)),
+    ttl_seconds=int(os.getenv('SERPAPI_CACHE_TTL', 300))
+)
+search_flight = SingleFlight(
+    executor=ThreadPoolExecutor(
+        max_workers=int(os.getenv('SERPAPI_MAX_WORKERS', 8)),
+        thread_name_prefix='serpapi'
+    )
+)
+
+def _fetch_web_snippet(query, cache_key):
     params = {
         "engine": "google",
-        "q": query,
-        "api_key": serpapi_key
+        "q": query
     }
+    start = time.monotonic()
     try:
-        results = serpapi.search(params)
-        if "answer_box" in results and "snippet" in results["answer_box"]:
-            return results["answer_box"]["snippet"]
-        elif "organic_results" in results and len(results["organic_results"]) > 0:
-            return results["organic_results"][0].get("snippet", "No snippet found.")
-        else:
-            return "I searched the web but couldn't find a clear answer."
+        # serpapi's search() sets no socket timeout, so a hung call would hold
+        # its executor thread for good; the request itself gives up instead
+        results = serpapi_client.request('GET', '/search', params=params, timeout=SERPAPI_TIMEOUT).json()
     except Exception as e:
-        return f"Web search failed: {e}"
+        serpapi_breaker.record_failure()
+        log_event('web_search_error', level=logging.WARNING, error=str(e))
+        return None
+    # A late answer does not clear the timeouts its callers already recorded
+    if time.monotonic() - start <= SERPAPI_TIMEOUT:
+        serpapi_breaker.record_success()
+
+    if "answer_box" in results and "snippet" in results["answer_box"]:
+        snippet = results["answer_box"]["snippet"]
+    elif "organic_results" in results and len(results["organic_results"]) > 0:
+        snippet = results["organic_results"][0].get("snippet", "No snippet found.")
+    else:
+        snippet = "I searched the web but couldn't find a clear answer."
+    # Cached here rather than by the caller so a lookup that finishes after
+    # its callers timed out still warms the cache
+    search_cache.set(cache_key, snippet)
+    return snippet
+
+def web_search_timeout(deadline=None):
+    """Seconds to wait for a web lookup: SERPAPI_TIMEOUT, or less when the deadline needs the time for Gemini"""
+    if deadline is None:
+        return SERPAPI_TIMEOUT
+    return deadline.budget(SERPAPI_TIMEOUT, reserve=LLM_MIN_BUDGET)
+
+def start_web_search(query, deadline=None):
+    """Start a SerpAPI lookup on the search executor without waiting for it.
+
+    Returns a Future for the snippet (already done on a cache hit), or
+    None when the lookup is skipped: SerpAPI's breaker is open or the
+    deadline leaves less than WEB_MIN_BUDGET for it.
+    """
+    cache_key = search_cache.make_key('serpapi', normalize_text(query))
+    snippet = search_cache.get(cache_key)
+    if snippet is not None:
+        future = Future()
+        future.set_result(snippet)
+        return future
+    if web_search_timeout(deadline) < WEB_MIN_BUDGET:
+        log_event('web_search_skipped', level=logging.WARNING, reason='deadline')
+        return None
+    if not serpapi_breaker.allow():
+        log_event('web_search_skipped', sample=True, reason='circuit_open')
+        return None
+    return search_flight.start(cache_key, lambda: _fetch_web_snippet(query, cache_key))
+
+def web_search_timed_out(timeout):
+    # Not a breaker failure: the lookup itself times out at SERPAPI_TIMEOUT and records that once
+    log_event('web_search_timeout', level=logging.WARNING, timeout=round(timeout, 3))
+
+def search_web(query: str, deadline=None):
+    """Helper function to search the web using SerpAPI.
+
+    Returns the best snippet, or None if the lookup failed, was skipped or
+    did not finish within web_search_timeout(deadline) seconds. A late
+    lookup keeps running and still fills the cache.
+    """
+    lookup = start_web_search(query, deadline)
+    if lookup is None:
+        return None
+    timeout = web_search_timeout(deadline)
+    try:
+        return lookup.result(timeout)
+    except FutureTimeoutError:
+        web_search_timed_out(timeout)
+        return None
+
+def web_lookup(input_text, deadline=None):
+    """Return (realtime, web_snippet) for a voice query.
+
+    web_snippet is None when the question is not real-time or there is no
+    usable lookup result within the deadline (see search_web). While
+    Gemini's breaker is open there is no lookup: no answer could use it.
+    """
+    with stage_latency.time('voice_search', 'web_search'):
+        realtime = needs_web_search(input_text)
+        if not realtime or gemini_breaker.is_open:
+            return realtime, None
+        return realtime, search_web(input_text, deadline)
+
+# All scam rules (English, Hindi, Bengali) compiled into one automaton
+scam_detector = ScamDetector()
+
+def detect_scam_categories(message):
+    """Return the scam rule categories that fire for the user message"""
+    return scam_detector.detect(message)
 
 def detect_scam_patterns(message):
     """Detect potential scam patterns in user message"""
-    for pattern in SCAM_PATTERNS:
-        if re.search(pattern, message):
-            return True
-    return False
+    return bool(detect_scam_categories(message))
 
 def get_proactive_suggestions(message):
     """Get relevant proactive suggestions based on user message"""
-    message_lower = message.lower()
-    
-    # English + Hindi + Bengali keywords for each category
-    savings_keywords = ['save', 'saving', 'money', 'बचत', 'पैसे', 'बचाना', 'টাকা', 'সাশ্রয়']
-    banking_keywords = ['bank', 'account', 'banking', 'बैंक', 'खाता', 'बैंकिंग', 'ব্যাংক', 'অ্যাকাউন্ট']
-    loan_keywords = ['loan', 'borrow', 'credit', 'लोन', 'उधार', 'ऋण', 'লোন', 'ঋণ']
-    insurance_keywords = ['insurance', 'policy', 'coverage', 'बीमा', 'पॉलिसी', 'বীমা', 'পলিসি']
-    
-    if any(word in message_lower for word in savings_keywords):
-        return 'savings'
-    elif any(word in message_lower for word in banking_keywords):
-        return 'banking'
-    elif any(word in message_lower for word in loan_keywords):
-        return 'loans'
-    elif any(word in message_lower for word in insurance_keywords):
-        return 'insurance'
-    return None
+    return keyword_index.best(keyword_index.scores(message), SUGGESTION_CATEGORIES)
 
-def clean_response(text):
-    """Clean the response text by removing HTML tags and fixing formatting"""
+def _replace_br_tags(text):
     # Replace <br> and <br/> tags with double newlines
-    text = re.sub(r'<br\s*/?>|<BR\s*/?>', '\n\n', text)
-    
+    return re.sub(r'<br\s*/?>|<BR\s*/?>', '\n\n', text)
+
+def _apply_format_rules(text):
+    """Apply the remaining clean_response substitutions without stripping the ends"""
     # Replace other HTML tags
     text = re.sub(r'<[^>]+>', '', text)
-    
+
     # Fix multiple consecutive newlines (more than 2) to just 2
     text = re.sub(r'\n{3,}', '\n\n', text)
-    
+
     # Ensure proper spacing after bullet points and numbers
     text = re.sub(r'(•|\d+\.)\s*', r'\1 ', text)
-    
-    return text.strip()
+
+    return text
+
+def clean_response(text):
+    """Clean the response text by removing HTML tags and fixing formatting"""
+    return _apply_format_rules(_replace_br_tags(text)).strip()
+
+def _unclosed_tag_start(text):
+    """Index of the first '<' after the last '>', i.e. a tag that may still be closed later"""
+    start = text.find('<', text.rfind('>') + 1)
+    return len(text) if start == -1 else start
+
+class StreamingCleaner:
+    """Incremental clean_response for streamed model output.
+
+    Text is only released up to a point where none of the clean_response
+    rules can span the cut: an unclosed '<', or a trailing run of
+    whitespace, tags, digits, '.' or '•', is held back until the next
+    chunk arrives. Joining everything returned by feed() and finish()
+    gives the same result as clean_response() on the full text.
+    """
+
+    def __init__(self):
+        self._raw = ''    # tail that may still turn into a <br> tag
+        self._text = ''   # <br> tags already replaced, other rules pending
+        self._started = False
+
+    def _safe_cut(self):
+        text = self._text
+        cut = _unclosed_tag_start(text)
+
+        # Walk back over characters a rule could still merge with the next chunk
+        while cut > 0:
+            ch = text[cut - 1]
+            if ch.isspace() or ch.isdigit() or ch in '.•':
+                cut -= 1
+            elif ch == '>':
+                tag_start = text.find('<', text.rfind('>', 0, cut - 1) + 1, cut - 1)
+                if tag_start == -1:
+                    break
+                cut = tag_start
+            else:
+                break
+        return cut
+
+    def _emit(self, text):
+        if not self._started:
+            text = text.lstrip()
+            self._started = bool(text)
+        return text
+
+    def feed(self, chunk):
+        """Add a raw chunk and return the cleaned text that is safe to send"""
+        self._raw += chunk
+        br_cut = _unclosed_tag_start(self._raw)
+        self._text += _replace_br_tags(self._raw[:br_cut])
+        self._raw = self._raw[br_cut:]
+
+        cut = self._safe_cut()
+        if cut == 0:
+            return ''
+        ready, self._text = self._text[:cut], self._text[cut:]
+        return self._emit(_apply_format_rules(ready))
+
+    def finish(self):
+        """Flush whatever is still held back at the end of the stream"""
+        remainder = self._text + _replace_br_tags(self._raw)
+        self._raw = self._text = ''
+        return self._emit(_apply_format_rules(remainder)).rstrip()
+
+def sse_event(data, event=None):
+    """Format a Server-Sent Event carrying a JSON payload"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_response(prompt, cache_key, final_payload, on_complete=None, client=None, endpoint='stream'):
+    """Stream a Gemini generation as cleaned SSE 'message' events, then a 'done' event.
+
+    on_complete(cleaned_text) runs after the full answer has been sent.
+    The request span of a stream ends when its headers are sent, so the
+    generation is timed here: the endpoint's 'first_chunk' stage until the
+    first answer text goes out and 'llm_call' for the whole stream.
+    """
+    cached_text = response_cache.get(cache_key) if cache_key else None
+    if cached_text is not None:
+        if on_complete:
+            on_complete(cached_text)
+        yield sse_event({'delta': cached_text})
+        yield sse_event(dict(final_payload, status='success'), event='done')
+        return
+
+    cleaner = StreamingCleaner()
+    parts = []
+    start = time.perf_counter()
+    try:
+        with stage_latency.time(endpoint, 'llm_call'):
+            gemini_breaker.check()
+            admit_client(client)
+            for chunk in model.generate_content(prompt, stream=True):
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata only)
+                    continue
+                delta = cleaner.feed(chunk_text)
+                if delta:
+                    if not parts:
+                        stage_latency.observe(time.perf_counter() - start, endpoint, 'first_chunk')
+                    parts.append(delta)
+                    yield sse_event({'delta': delta})
+            delta = cleaner.finish()
+            if delta:
+                if not parts:
+                    stage_latency.observe(time.perf_counter() - start, endpoint, 'first_chunk')
+                parts.append(delta)
+                yield sse_event({'delta': delta})
+    except Exception as e:
+        log_event('gemini_stream_error', level=logging.ERROR, error=str(e), sent_parts=len(parts))
+        if is_gemini_outage(e):
+            gemini_breaker.record_failure()
+        if is_queueable_rate_limit(e) and not parts:
+            try:
+                job_id = queue_generation(prompt, cache_key, final_payload, on_complete)
+            except JobQueueFull as full:
+                e = full
+            else:
+                yield sse_event({
+                    'job_id': job_id,
+                    'poll_url': f"/api/py/jobs/{job_id}",
+                    'status': 'queued'
+                }, event='queued')
+                return
+        body = {'error': clean_response(str(e)), 'code': error_status(e), 'status': 'error'}
+        if retry_after_seconds(e) is not None:
+            body['retry_after'] = retry_after_seconds(e)
+        yield sse_event(body, event='error')
+        return
+
+    if not parts:
+        yield sse_event({
+            'error': "Sorry, I couldn't generate a response. Please try again.",
+            'status': 'error'
+        }, event='error')
+        return
+
+    gemini_breaker.record_success()
+    if cache_key:
+        response_cache.set(cache_key, ''.join(parts))
+    if on_complete:
+        on_complete(''.join(parts))
+    yield sse_event(dict(final_payload, status='success'), event='done')
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def reply_events(reply):
+    """A response body that needed no model call as SSE: the whole answer in one delta, then 'done'"""
+    return [
+        sse_event({'delta': reply['response']}),
+        sse_event({key: value for key, value in reply.items() if key != 'response'}, event='done')
+    ]
+
+# Language-specific instructions for voice search
+SEARCH_LANGUAGE_INSTRUCTIONS = {
+    'hindi': "Please respond in Hindi using Devanagari script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'bengali': "Please respond in Bengali using Bengali script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'tamil': "Please respond in Tamil using Tamil script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'marathi': "Please respond in Marathi using Devanagari script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'telugu': "Please respond in Telugu using Telugu script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'kannada': "Please respond in Kannada using Kannada script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'gujarati': "Please respond in Gujarati using Gujarati script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'malayalam': "Please respond in Malayalam using Malayalam script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
+    'english': "Please respond in English. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks."
+}
+
+# Strict language instructions for the chatbot so the model replies only in
+# the language selected by the user.
+CHAT_LANGUAGE_INSTRUCTIONS = {
+    'english': (
+        "Please respond strictly in English. Do not use any other language or script. "
+        "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
+    ),
+    'hindi': (
+        "Please respond strictly in Hindi using Devanagari script. Do not use any other language. "
+        "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
+    ),
+    'bengali': (
+        "Please respond strictly in Bengali using Bengali script. Do not use any other language. "
+        "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
+    )
+}
+
+# Questions offered as one-tap shortcuts by the clients
+COMMON_QUESTIONS = {
+    'english': [
+        "How to save money effectively?",
+        "How to open a bank account?",
+        "What is a fixed deposit?",
+        "How to apply for a loan?",
+        "What is insurance and why do I need it?",
+        "How to use UPI payments?",
+        "What are government schemes for farmers?",
+        "How to invest small amounts?"
+    ],
+    'hindi': [
+        "पैसे कैसे बचाएं?",
+        "बैंक खाता कैसे खोलें?",
+        "फिक्स्ड डिपॉजिट क्या है?",
+        "लोन के लिए आवेदन कैसे करें?",
+        "बीमा क्या है और क्यों जरूरी है?",
+        "UPI पेमेंट कैसे करें?",
+        "किसानों के लिए सरकारी योजनाएं",
+        "कम पैसे में निवेश कैसे करें?"
+    ],
+    'bengali': [
+        "কিভাবে টাকা সাশ্রয় করবেন?",
+        "ব্যাংক অ্যাকাউন্ট কিভাবে খুলবেন?",
+        "ফিক্সড ডিপোজিট কি?",
+        "লোনের জন্য আবেদন কিভাবে করবেন?",
+        "বীমা কি এবং কেন প্রয়োজন?",
+        "UPI পেমেন্ট কিভাবে করবেন?",
+        "কৃষকদের জন্য সরকারি প্রকল্প",
+        "অল্প টাকায় বিনিয়োগ কিভাবে করবেন?"
+    ]
+}
+
+# The questions list changes only with a deploy, so clients may cache it
+COMMON_QUESTIONS_ETAG = hashlib.sha256(
+    json.dumps(COMMON_QUESTIONS, sort_keys=True, ensure_ascii=False).encode('utf-8')
+).hexdigest()[:16]
+COMMON_QUESTIONS_CACHE_CONTROL = f"public, max-age={int(os.getenv('COMMON_QUESTIONS_MAX_AGE', 3600))}"
+
+# Answers to COMMON_QUESTIONS generated ahead of time (python warm_answers.py),
+# served without a model call when a chat or voice search asks one of them.
+ANSWER_STORE_PATH = os.getenv(
+    'ANSWER_STORE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'common_answers.json')
+)
+answer_store = AnswerStore.load(ANSWER_STORE_PATH, PROMPT_VERSION)
+log_event('answer_store_loaded', path=ANSWER_STORE_PATH, **answer_store.stats())
+
+# Answered first-turn chat questions, retrievable by similarity so that
+# paraphrases ("how do I open bank account", "bank khata kaise khole") reuse
+# an earlier answer. Seeded with the pre-generated chat answers.
+paraphrase_index = QuestionIndex(
+    max_entries=int(os.getenv('PARAPHRASE_INDEX_SIZE', 5000)),
+    threshold=float(os.getenv('PARAPHRASE_THRESHOLD', 0.85))
+)
+for _language, _question, _answer in answer_store.items('chat'):
+    paraphrase_index.add(_language, _question, _answer)
+
+SCAM_WARNING = """
+⚠️ **SCAM ALERT** ⚠️
+
+I detected something that might be a scam attempt. Please remember:
+
+🔒 **Never share your OTP, PIN, or passwords**
+💳 **Banks never ask for card details over phone/message**
+💰 **Be careful of "guaranteed returns" or "easy money" schemes**
+📱 **Don't click suspicious links or download unknown apps**
+
+If someone is pressuring you for money or personal information, please contact your bank directly or local authorities.
+
+Now, how can I help you with legitimate financial advice?
+"""
+
+def needs_web_search(input_text):
+    """Real-time questions (prices, rates, news...) get a web lookup"""
+    return 'realtime' in keyword_index.scores(input_text)
+
+def build_search_prompt(input_text, language, web_snippet=None, realtime=False):
+    """Assemble the voice search prompt.
+
+    Returns the prompt and its response cache key, which is None for
+    real-time questions.
+    """
+    language_instruction = SEARCH_LANGUAGE_INSTRUCTIONS.get(language.lower(), SEARCH_LANGUAGE_INSTRUCTIONS['english'])
+
+    # Answers to real-time questions go stale quickly, so they are never
+    # cached, even when the web lookup timed out.
+    if web_snippet is not None:
+        prompt = (
+            f"{SYSTEM_PROMPT}\n\n"
+            f"{language_instruction}"
+            f"Use the following real-time web result to answer the user's question:\n\n"
+            f"Web Search Result:\n{web_snippet}\n\n"
+            f"User Question:\n{input_text}\n\n"
+            "Provide a comprehensive financial advice response."
+        )
+        return prompt, None
+
+    prompt = (
+        f"{SYSTEM_PROMPT}\n\n"
+        f"{language_instruction}"
+        f"User Question: {input_text}\n\n"
+        "Provide comprehensive financial advice."
+    )
+    if realtime:
+        return prompt, None
+    cache_key = response_cache.make_key(
+        'search', PROMPT_VERSION, language.lower(), normalize_text(input_text)
+    )
+    return prompt, cache_key
+
+def get_suggestions(user_message, language):
+    """Get the proactive suggestion category and up to two suggestions in the user's language"""
+    suggestions = []
+    suggestion_category = get_proactive_suggestions(user_message)
+    if suggestion_category:
+        if language in PROACTIVE_SUGGESTIONS[suggestion_category]:
+            suggestions = PROACTIVE_SUGGESTIONS[suggestion_category][language][:2]
+        else:
+            suggestions = PROACTIVE_SUGGESTIONS[suggestion_category]['english'][:2]
+    return suggestion_category, suggestions
+
+# Conversation history is packed newest-first into a token budget; older
+# turns are folded into a cached rolling summary.
+context_builder = ContextBuilder(
+    token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', 800)),
+    summary_tokens=int(os.getenv('CONTEXT_SUMMARY_TOKENS', 200))
+)
+
+def build_chat_prompt(user_message, language, chat_history):
+    """Assemble the chatbot prompt from the recent history. Returns the prompt and its cache key"""
+    # Prepare conversation history for context
+    conversation_context = context_builder.build(chat_history)
+
+    language_instruction = CHAT_LANGUAGE_INSTRUCTIONS.get(language.lower(), CHAT_LANGUAGE_INSTRUCTIONS['english'])
+
+    full_prompt = (
+        f"{SYSTEM_PROMPT}\n\nConversation History:\n{conversation_context}\n\nUser: {user_message}\n\n"
+        f"{language_instruction}\n\nAssistant: "
+    )
+
+    # Follow-up turns depend on the conversation so far, so the history
+    # is part of the key; first-turn questions share entries.
+    cache_key = response_cache.make_key(
+        'chat', PROMPT_VERSION, language.lower(), normalize_text(user_message),
+        normalize_text(conversation_context)
+    )
+    return full_prompt, cache_key
+
+# Server-side conversation sessions, so clients can send only the new message
+session_store = create_session_store()
+
+def resolve_session(data):
+    """Return (session_id, chat_history) for a chat request.
+
+    A known session_id supplies the history from the store. Otherwise the
+    request's chat_history field is used as before and seeds a new session.
+    Raises SessionExpired for an unknown or expired session_id without
+    chat_history, rather than answering with the context lost.
+    """
+    session_id = data.get('session_id')
+    if session_id:
+        history = session_store.get(session_id)
+        if history is not None:
+            return session_id, history
+        if not data.get('chat_history'):
+            raise SessionExpired(session_id)
+
+    chat_history = data.get('chat_history', [])
+    # Clients sending chat_history include the current message as its last
+    # entry; the session only keeps completed turns.
+    seed = chat_history
+    if seed and seed[-1].get('sender') == 'user' and seed[-1].get('message') == data.get('message'):
+        seed = seed[:-1]
+    return session_store.create(seed), chat_history
+
+def record_turn(session_id, user_message, answer):
+    """Store a completed user/bot exchange in the session"""
+    if session_id:
+        session_store.append(session_id, [
+            {'sender': 'user', 'message': user_message},
+            {'sender': 'bot', 'message': answer}
+        ])
+
+# The prepare_*/finish_* helpers hold everything around the model call so the
+# Flask routes and the ASGI app (asgi.py) share one request/response contract.
+
+def prepare_search(input_text, language, web_snippet=None, realtime=False):
+    """Voice search steps before the model call.
+
+    Returns (reply, plan): reply is a finished response body for cache
+    hits and pre-generated answers, otherwise None and plan holds the
+    prompt and cache key.
+    """
+    if not realtime:
+        precomputed = answer_store.get('search', language, input_text)
+        if precomputed is not None:
+            return {
+                "response": precomputed,
+                "language": language,
+                "status": "success"
+            }, {'prompt': None, 'cache_key': None, 'language': language}
+
+    with stage_latency.time('voice_search', 'prompt_assembly'):
+        prompt, cache_key = build_search_prompt(input_text, language, web_snippet, realtime)
+    plan = {'prompt': prompt, 'cache_key': cache_key, 'language': language}
+    if cache_key:
+        cached_text = response_cache.get(cache_key)
+        if cached_text is not None:
+            return {
+                "response": cached_text,
+                "language": language,
+                "status": "success"
+            }, plan
+    return None, plan
+
+def finish_search(plan, text):
+    """Build the voice search response body from the generated text"""
+    if text:
+        with stage_latency.time('voice_search', 'clean_response'):
+            cleaned_text = clean_response(text)
+        if plan['cache_key']:
+            response_cache.set(plan['cache_key'], cleaned_text)
+        return {
+            "response": cleaned_text,
+            "language": plan['language'],
+            "status": "success"
+        }
+    return {
+        "response": "Sorry, I couldn't generate a response. Please try again.",
+        "language": plan['language'],
+        "status": "error"
+    }
+
+def search_error_body(language):
+    error_message = "I'm having trouble processing your request. Please try again."
+    return {
+        "response": clean_response(error_message),
+        "language": language,
+        "status": "error"
+    }
+
+def is_first_turn(user_message, chat_history):
+    """True when the history holds nothing but (possibly) the current message.
+
+    Only such questions are answered from or added to the paraphrase index,
+    since later answers depend on the conversation.
+    """
+    return all(m.get('sender') == 'user' and m.get('message') == user_message for m in chat_history)
+
+def prepare_chat(user_message, language, chat_history, session_id=None):
+    """Chat steps before the model call: scam check, suggestions, prompt and cache lookup.
+
+    Returns (reply, plan): reply is a finished response body when no model
+    call is needed, otherwise None and plan holds the prompt, cache key and
+    suggestions.
+    """
+    # Check for scam patterns
+    with stage_latency.time('chat', 'scam_check'):
+        scam_categories = detect_scam_categories(user_message)
+    if scam_categories:
+        return {
+            'response': clean_response(SCAM_WARNING),
+            'scam_detected': True,
+            'scam_categories': scam_categories,
+            'session_id': session_id,
+            'status': 'success'
+        }, None
+
+    # Get proactive suggestions with language awareness
+    with stage_latency.time('chat', 'suggestions'):
+        suggestion_category, suggestions = get_suggestions(user_message, language)
+
+    precomputed = answer_store.get('chat', language, user_message)
+    if precomputed is not None:
+        record_turn(session_id, user_message, precomputed)
+        return {
+            'response': precomputed,
+            'suggestions': suggestions,
+            'session_id': session_id,
+            'status': 'success'
+        }, {'suggestion_category': suggestion_category, 'suggestions': suggestions}
+
+    with stage_latency.time('chat', 'prompt_assembly'):
+        full_prompt, cache_key = build_chat_prompt(user_message, language, chat_history)
+    plan = {
+        'prompt': full_prompt,
+        'cache_key': cache_key,
+        'language': language,
+        'suggestion_category': suggestion_category,
+        'suggestions': suggestions,
+        'user_message': user_message,
+        'session_id': session_id,
+        'first_turn': is_first_turn(user_message, chat_history)
+    }
+    cached_text = response_cache.get(cache_key)
+    if cached_text is None and plan['first_turn']:
+        with stage_latency.time('chat', 'paraphrase_lookup'):
+            match = paraphrase_index.lookup(language.lower(), user_message)
+        if match:
+            cached_text = match[0]
+            response_cache.set(cache_key, cached_text)
+    if cached_text is not None:
+        record_turn(session_id, user_message, cached_text)
+        return {
+            'response': cached_text,
+            'suggestions': suggestions,
+            'session_id': session_id,
+            'status': 'success'
+        }, plan
+    return None, plan
+
+def remember_chat_answer(plan, answer):
+    """Record the turn, and index a first-turn answer for paraphrases of the question"""
+    if plan['first_turn']:
+        paraphrase_index.add(plan['language'].lower(), plan['user_message'], answer)
+    record_turn(plan['session_id'], plan['user_message'], answer)
+
+def finish_chat(plan, text):
+    """Build the chat response body from the generated text"""
+    if text:
+        with stage_latency.time('chat', 'clean_response'):
+            cleaned_text = clean_response(text)
+        response_cache.set(plan['cache_key'], cleaned_text)
+        remember_chat_answer(plan, cleaned_text)
+        return {
+            'response': cleaned_text,
+            'suggestions': plan['suggestions'],
+            'session_id': plan['session_id'],
+            'status': 'success'
+        }
+    error_message = "Sorry, I couldn't generate a response. Please try again."
+    return {
+        'response': clean_response(error_message),
+        'language': plan['language'],
+        'status': 'error'
+    }
+
+def log_chat_request(session_id, language, chat_history, plan, reply):
+    """Sampled summary of a chat request; message text is not logged"""
+    log_event(
+        'chat', sample=True, session_id=session_id, language=language,
+        history_turns=len(chat_history),
+        suggestion_category=plan['suggestion_category'] if plan else None,
+        outcome='scam_warning' if plan is None else 'cached' if reply else 'generated'
+    )
+
+def chat_error_body(e, error_traceback):
+    """Error body and status code for a failed chat request"""
+    if isinstance(e, SessionExpired):
+        # The client still has the conversation and resends it as chat_history
+        return {
+            'error': str(e),
+            'session_reset': True,
+            'status': 'error'
+        }, 409
+    if isinstance(e, CircuitOpenError):
+        return {
+            'error': clean_response(str(e)),
+            'retry_after': retry_after_seconds(e),
+            'status': 'error'
+        }, 503
+    if '429' in str(e):
+        error_message = 'Rate limit exceeded. Please try again in a minute.'
+        body = {
+            'error': clean_response(error_message),
+            'status': 'error'
+        }
+        if retry_after_seconds(e) is not None:
+            body['retry_after'] = retry_after_seconds(e)
+        return body, 429
+    return {
+        'error': clean_response(str(e)),
+        'traceback': error_traceback,
+        'status': 'error'
+    }, 500
+
+def queue_chat_generation(plan):
+    """Hand a rate-limited chat generation to the job queue, recording the turn when it completes"""
+    return queue_generation(
+        plan['prompt'], plan['cache_key'],
+        {'suggestions': plan['suggestions'], 'session_id': plan['session_id']},
+        lambda answer: record_turn(plan['session_id'], plan['user_message'], answer)
+    )
+
+def queued_body(job_id):
+    """Body and headers for a generation handed to the background job queue"""
+    job = job_queue.get(job_id)
+    retry_after = job.get('retry_after', 5) if job else 5
+    return {
+        'job_id': job_id,
+        'poll_url': f"/api/py/jobs/{job_id}",
+        'retry_after': retry_after,
+        'status': 'queued'
+    }, {'Retry-After': str(retry_after)}
+
+def job_status_body(job_id):
+    """Body, status code and headers describing a queued generation"""
+    job = job_queue.get(job_id)
+    if job is None:
+        return {
+            'error': 'Job not found or expired',
+            'status': 'error'
+        }, 404, {}
+
+    if job['status'] in ('queued', 'running'):
+        retry_after = job.get('retry_after', 1)
+        return {
+            'job_id': job_id,
+            'attempts': job['attempts'],
+            'retry_after': retry_after,
+            'status': job['status']
+        }, 202, {'Retry-After': str(retry_after)}
+
+    if job['status'] == 'failed':
+        if is_rate_limit_error(job['error']):
+            return {
+                'error': 'Rate limit exceeded. Please try again in a minute.',
+                'status': 'error'
+            }, 429, {}
+        return {
+            'error': clean_response(job['error']),
+            'status': 'error'
+        }, 500, {}
+
+    return dict(job['payload'], response=job['result'], job_id=job_id, status='success'), 200, {}
+
+# Batch chat for clients that sync many questions at once (e.g. surveys
+# collected offline). Items go through the same pipeline as /api/py/chat,
+# at most BATCH_CONCURRENCY at a time across all batches in this worker.
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', 50))
+BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', 8))
+batch_executor = ThreadPoolExecutor(max_workers=BATCH_CONCURRENCY, thread_name_prefix='chat-batch')
+
+def parse_batch(data):
+    """Validate a batch request body. Returns (items, error_body)"""
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        return None, {'error': "'items' must be a non-empty list", 'status': 'error'}
+    if len(items) > BATCH_MAX_ITEMS:
+        return None, {'error': f"A batch can hold at most {BATCH_MAX_ITEMS} items", 'status': 'error'}
+    return items, None
+
+def batch_item_error(item):
+    """Error body for a malformed batch item, or None if it can be processed"""
+    if not isinstance(item, dict) or not isinstance(item.get('message'), str) or not item['message'].strip():
+        return {'error': "Each item needs a non-empty 'message'", 'status': 'error'}
+    return None
+
+def wants_ndjson(data, accept):
+    """Batch results are streamed as NDJSON when asked for in the body or the Accept header"""
+    return bool(data.get('stream')) or 'application/x-ndjson' in (accept or '')
+
+def batch_item_body(index, item, body, status):
+    """One item's result: its chat response body plus its position and status code"""
+    result = dict(body, index=index, code=status)
+    if isinstance(item, dict) and 'id' in item:
+        result['id'] = item['id']
+    return result
+
+def batch_summary(results):
+    return {'items': len(results), 'failed': sum(1 for r in results if r['code'] >= 400)}
+
+def chat_item(item, client=None):
+    """Run one batch item through the chat pipeline. Returns (body, status code)"""
+    error = batch_item_error(item)
+    if error:
+        return error, 400
+    try:
+        language = item.get('language', 'english')
+        session_id, chat_history = resolve_session(item)
+        reply, plan = prepare_chat(item['message'], language, chat_history, session_id)
+        if reply:
+            return reply, 200
+        try:
+            with stage_latency.time('chat_batch', 'llm_call'):
+                text = generate_text(plan['prompt'], client=client)
+        except Exception as e:
+            if not is_queueable_rate_limit(e):
+                raise
+            body, _ = queued_body(queue_chat_generation(plan))
+            return body, 202
+        return finish_chat(plan, text), 200
+    except Exception as e:
+        log_event('chat_batch_item_error', level=logging.ERROR, error=str(e))
+        return chat_error_body(e, traceback.format_exc())
 
 # NEW VOICE SEARCH ENDPOINT (Converted from FastAPI)
 @app.route('/api/py/search', methods=['POST'])
 def voice_search():
-    """Voice search endpoint with multilingual support"""
+    """Voice search endpoint with multilingual support.
+
+    Answers within VOICE_SEARCH_DEADLINE seconds: the web lookup and the
+    Gemini call share that budget.
+    """
+    deadline = Deadline(VOICE_SEARCH_DEADLINE)
     try:
-        data = request.json
+        with stage_latency.time('voice_search', 'json_parse'):
+            data = request.json
         input_text = data.get('text', '')
         language = data.get('language', 'english')  # Get language from request
-        
-        print(f"Voice search - Input: {input_text}, Language: {language}")
-        
-        # Language-specific instructions
-        language_instructions = {
-            'hindi': "Please respond in Hindi using Devanagari script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'bengali': "Please respond in Bengali using Bengali script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'tamil': "Please respond in Tamil using Tamil script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'marathi': "Please respond in Marathi using Devanagari script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'telugu': "Please respond in Telugu using Telugu script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'kannada': "Please respond in Kannada using Kannada script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'gujarati': "Please respond in Gujarati using Gujarati script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'malayalam': "Please respond in Malayalam using Malayalam script. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks.",
-            'english': "Please respond in English. Be clear and helpful. Use double newlines (\\n\\n) for paragraph breaks."
-        }
-        
-        language_instruction = language_instructions.get(language.lower(), language_instructions['english'])
-        
-        # Check for real-time keywords
-        realtime_keywords = ["today", "current", "latest", "now", "rate", "price", "update", "news"]
-        
-        if any(word in input_text.lower() for word in realtime_keywords):
-            web_snippet = search_web(input_text)
-            prompt = (
-                f"{SYSTEM_PROMPT}\n\n"
-                f"{language_instruction}"
-                f"Use the following real-time web result to answer the user's question:\n\n"
-                f"Web Search Result:\n{web_snippet}\n\n"
-                f"User Question:\n{input_text}\n\n"
-                "Provide a comprehensive financial advice response."
-            )
-        else:
-            prompt = (
-                f"{SYSTEM_PROMPT}\n\n"
-                f"{language_instruction}"
-                f"User Question: {input_text}\n\n"
-                "Provide comprehensive financial advice."
-            )
+
+        realtime, web_snippet = web_lookup(input_text, deadline)
+        reply, plan = prepare_search(input_text, language, web_snippet, realtime)
+        log_event(
+            'voice_search', sample=True, language=language, input_chars=len(input_text),
+            realtime=realtime, web_snippet=web_snippet is not None, cached=reply is not None
+        )
+        if reply:
+            return jsonify(reply)
 
         try:
-            model = genai.GenerativeModel('models/gemini-2.5-flash-lite')
-            response = model.generate_content(prompt)
-            
-            if response.text:
-                cleaned_text = clean_response(response.text)
-                return jsonify({
-                    "response": cleaned_text,
-                    "language": language,
-                    "status": "success"
-                })
-            else:
-                return jsonify({
-                    "response": "Sorry, I couldn't generate a response. Please try again.",
-                    "language": language,
-                    "status": "error"
-                })
-                
+            with stage_latency.time('voice_search', 'llm_call'):
+                text = generate_text(plan['prompt'], client=request_client(), timeout=deadline.remaining())
+            return jsonify(finish_search(plan, text))
+
         except Exception as e:
-            print(f"Gemini API error: {str(e)}")
-            error_message = "I'm having trouble processing your request. Please try again."
-            return jsonify({
-                "response": clean_response(error_message),
-                "language": language,
-                "status": "error"
-            })
+            log_event('gemini_error', level=logging.ERROR, endpoint='voice_search', error=str(e))
+            return jsonify(search_error_body(language))
 
     except Exception as e:
-        print(f"Voice search error: {str(e)}")
+        log_event('voice_search_error', level=logging.ERROR, error=str(e))
         error_message = f"Error processing voice search: {str(e)}"
         return jsonify({
             "response": clean_response(error_message),
@@ -292,172 +1368,246 @@ def voice_search():
             "status": "error"
         })
 
+@app.route('/api/py/search/stream', methods=['POST'])
+def voice_search_stream():
+    """Streaming voice search: cleaned answer chunks as Server-Sent Events"""
+    data = request.json or {}
+    input_text = data.get('text', '')
+    language = data.get('language', 'english')
+
+    log_event('voice_search_stream', sample=True, language=language, input_chars=len(input_text))
+
+    try:
+        # Only the web lookup is bounded here: once the answer streams the client sees progress
+        realtime, web_snippet = web_lookup(input_text, Deadline(VOICE_SEARCH_DEADLINE))
+        reply, plan = prepare_search(input_text, language, web_snippet, realtime)
+    except Exception as e:
+        log_event('voice_search_error', level=logging.ERROR, error=str(e))
+        return sse_response(iter([sse_event({
+            'error': clean_response(f"Error processing voice search: {str(e)}"),
+            'status': 'error'
+        }, event='error')]))
+
+    if reply:
+        return sse_response(iter(reply_events(reply)))
+    return sse_response(stream_response(
+        plan['prompt'], plan['cache_key'], {'language': language},
+        client=request_client(), endpoint='voice_search_stream'
+    ))
+
 # EXISTING CHATBOT ENDPOINT
 @app.route('/api/py/chat', methods=['POST'])
 def chat():
     try:
-        print("Received chat request")
-        data = request.json
-        print(f"Request data: {data}")
-        
+        with stage_latency.time('chat', 'json_parse'):
+            data = request.json
+
         user_message = data.get('message', '')
         language = data.get('language', 'english')
-        chat_history = data.get('chat_history', [])
-        
-        # Check for scam patterns
-        scam_detected = detect_scam_patterns(user_message)
-        if scam_detected:
-            scam_warning = """
-⚠️ **SCAM ALERT** ⚠️
+        session_id, chat_history = resolve_session(data)
 
-I detected something that might be a scam attempt. Please remember:
+        reply, plan = prepare_chat(user_message, language, chat_history, session_id)
+        log_chat_request(session_id, language, chat_history, plan, reply)
 
-🔒 **Never share your OTP, PIN, or passwords**
-💳 **Banks never ask for card details over phone/message**
-💰 **Be careful of "guaranteed returns" or "easy money" schemes**
-📱 **Don't click suspicious links or download unknown apps**
+        if reply:
+            return jsonify(reply)
 
-If someone is pressuring you for money or personal information, please contact your bank directly or local authorities.
+        try:
+            with stage_latency.time('chat', 'llm_call'):
+                text = generate_text(plan['prompt'], client=request_client())
+        except Exception as e:
+            if not is_queueable_rate_limit(e):
+                raise
+            log_event('chat_rate_limited', level=logging.WARNING, session_id=session_id)
+            job_id = queue_chat_generation(plan)
+            body, headers = queued_body(job_id)
+            return jsonify(body), 202, headers
 
-Now, how can I help you with legitimate financial advice?
-"""
-            return jsonify({
-                'response': clean_response(scam_warning),
-                'scam_detected': True,
-                'status': 'success'
-            })
-        
-        # Get proactive suggestions with language awareness
-        suggestions = []
-        suggestion_category = get_proactive_suggestions(user_message)
-        if suggestion_category:
-            if language in PROACTIVE_SUGGESTIONS[suggestion_category]:
-                suggestions = PROACTIVE_SUGGESTIONS[suggestion_category][language][:2]
-            else:
-                suggestions = PROACTIVE_SUGGESTIONS[suggestion_category]['english'][:2]
-        
-        print(f"User message: {user_message}")
-        print(f"Selected language: {language}")
-        print(f"Suggestion category: {suggestion_category}")
-        print(f"Suggestions found: {suggestions}")
-        
-        # Prepare conversation history for context
-        conversation_context = ""
-        if chat_history:
-            for msg in chat_history[-5:]:
-                role = "User" if msg['sender'] == 'user' else "Assistant"
-                conversation_context += f"{role}: {msg['message']}\n"
-        
-        # Prepare the prompt with strict language instruction so the model
-        # replies only in the language selected by the user.
-        language_instructions = {
-            'english': (
-                "Please respond strictly in English. Do not use any other language or script. "
-                "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
-            ),
-            'hindi': (
-                "Please respond strictly in Hindi using Devanagari script. Do not use any other language. "
-                "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
-            ),
-            'bengali': (
-                "Please respond strictly in Bengali using Bengali script. Do not use any other language. "
-                "Format the response clearly with sections and bullet points. Use double newlines (\\n\\n) for paragraph breaks."
-            )
-        }
+        return jsonify(finish_chat(plan, text))
 
-        language_instruction = language_instructions.get(language.lower(), language_instructions['english'])
+    except SessionExpired as e:
+        log_event('chat_session_expired', session_id=e.session_id)
+        body, status = chat_error_body(e, None)
+        return jsonify(body), status
 
-        full_prompt = (
-            f"{SYSTEM_PROMPT}\n\nConversation History:\n{conversation_context}\n\nUser: {user_message}\n\n"
-            f"{language_instruction}\n\nAssistant: "
-        )
-        
-        print(f"Sending prompt to Gemini API using model: {model._model_name}")
-        
-        max_retries = 3
-        retry_count = 0
-        
-        while retry_count < max_retries:
-            try:
-                response = model.generate_content(full_prompt)
-                print(f"Received response from Gemini API: {response.text}")
-                
-                if response.text:
-                    cleaned_text = clean_response(response.text)
-                    return jsonify({
-                        'response': cleaned_text,
-                        'suggestions': suggestions,
-                        'status': 'success'
-                    })
-                else:
-                    error_message = "Sorry, I couldn't generate a response. Please try again."
-                    return jsonify({
-                        'response': clean_response(error_message),
-                        'language': language,
-                        'status': 'error'
-                    })
-                
-            except Exception as retry_error:
-                if '429' in str(retry_error) and retry_count < max_retries - 1:
-                    retry_count += 1
-                    print(f"Rate limit hit, waiting 60 seconds before retry {retry_count}")
-                    time.sleep(60)
-                else:
-                    raise retry_error
-                    
     except Exception as e:
         error_traceback = traceback.format_exc()
-        print(f"Error occurred: {str(e)}")
-        print(f"Traceback: {error_traceback}")
-        
-        if '429' in str(e):
-            error_message = 'Rate limit exceeded. Please try again in a minute.'
-            return jsonify({
-                'error': clean_response(error_message),
-                'status': 'error'
-            }), 429
-        else:
-            return jsonify({
-                'error': clean_response(str(e)),
-                'traceback': error_traceback,
-                'status': 'error'
-            }), 500
+        log_event('chat_error', level=logging.ERROR, error=str(e), traceback=error_traceback)
+
+        body, status = chat_error_body(e, error_traceback)
+        return jsonify(body), status, rate_limit_headers(e)
+
+@app.route('/api/py/chat/stream', methods=['POST'])
+def chat_stream():
+    """Streaming chat: cleaned answer chunks as Server-Sent Events.
+
+    Emits 'message' events with {"delta": ...} followed by a 'done' event
+    carrying the suggestions, or an 'error' event.
+    """
+    data = request.json or {}
+    user_message = data.get('message', '')
+    language = data.get('language', 'english')
+    try:
+        session_id, chat_history = resolve_session(data)
+    except SessionExpired as e:
+        log_event('chat_session_expired', session_id=e.session_id)
+        body, status = chat_error_body(e, None)
+        return sse_response(iter([sse_event(dict(body, code=status), event='error')]))
+
+    # Scam warnings, pre-generated answers and cached or paraphrased
+    # answers are sent whole, as in /api/py/chat
+    reply, plan = prepare_chat(user_message, language, chat_history, session_id)
+    log_chat_request(session_id, language, chat_history, plan, reply)
+    if reply:
+        return sse_response(iter(reply_events(reply)))
+
+    return sse_response(stream_response(
+        plan['prompt'], plan['cache_key'], {'suggestions': plan['suggestions'], 'session_id': session_id},
+        lambda answer: remember_chat_answer(plan, answer),
+        client=request_client(), endpoint='chat_stream'
+    ))
+
+@app.route('/api/py/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer many chat messages in one request.
+
+    Body: {"items": [{"message", "language", "chat_history" or "session_id", "id"}], "stream": bool}.
+    Returns {"results": [...], "items", "failed"} with results in request
+    order, or with "stream": true (or Accept: application/x-ndjson) one JSON
+    line per item as it finishes followed by a summary line. Each result
+    is the /api/py/chat body plus "index", "code" and the item's "id".
+    """
+    data = request.get_json(silent=True) or {}
+    items, error = parse_batch(data)
+    if error:
+        return jsonify(error), 400
+    log_event('chat_batch', sample=True, items=len(items))
+
+    client = request_client()
+    futures = {batch_executor.submit(chat_item, item, client): index for index, item in enumerate(items)}
+
+    if wants_ndjson(data, request.headers.get('Accept')):
+        def lines():
+            results = []
+            for future in as_completed(futures):
+                index = futures[future]
+                body, status = future.result()
+                result = batch_item_body(index, items[index], body, status)
+                results.append(result)
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+            yield json.dumps(dict(batch_summary(results), status='done')) + '\n'
+        return Response(lines(), mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+    results = [None] * len(items)
+    for future, index in futures.items():
+        body, status = future.result()
+        results[index] = batch_item_body(index, items[index], body, status)
+    return jsonify(dict(batch_summary(results), results=results, status='success'))
+
+def common_questions_headers():
+    # Weak: the same list is sent identity, gzip or brotli encoded
+    return {'ETag': f'W/"{COMMON_QUESTIONS_ETAG}"', 'Cache-Control': COMMON_QUESTIONS_CACHE_CONTROL}
 
 @app.route('/api/py/common-questions', methods=['GET'])
 def get_common_questions():
-    questions = {
-        'english': [
-            "How to save money effectively?",
-            "How to open a bank account?",
-            "What is a fixed deposit?",
-            "How to apply for a loan?",
-            "What is insurance and why do I need it?",
-            "How to use UPI payments?",
-            "What are government schemes for farmers?",
-            "How to invest small amounts?"
-        ],
-        'hindi': [
-            "पैसे कैसे बचाएं?",
-            "बैंक खाता कैसे खोलें?",
-            "फिक्स्ड डिपॉजिट क्या है?",
-            "लोन के लिए आवेदन कैसे करें?",
-            "बीमा क्या है और क्यों जरूरी है?",
-            "UPI पेमेंट कैसे करें?",
-            "किसानों के लिए सरकारी योजनाएं",
-            "कम पैसे में निवेश कैसे करें?"
-        ],
-        'bengali': [
-            "কিভাবে টাকা সাশ্রয় করবেন?",
-            "ব্যাংক অ্যাকাউন্ট কিভাবে খুলবেন?",
-            "ফিক্সড ডিপোজিট কি?",
-            "লোনের জন্য আবেদন কিভাবে করবেন?",
-            "বীমা কি এবং কেন প্রয়োজন?",
-            "UPI পেমেন্ট কিভাবে করবেন?",
-            "কৃষকদের জন্য সরকারি প্রকল্প",
-            "অল্প টাকায় বিনিয়োগ কিভাবে করবেন?"
-        ]
-    }
-    return jsonify(questions)
+    if request.if_none_match.contains_weak(COMMON_QUESTIONS_ETAG):
+        return '', 304, common_questions_headers()
+    return jsonify(COMMON_QUESTIONS), 200, common_questions_headers()
+
+@app.route('/api/py/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Poll a queued generation. 202 while pending, the chat response shape once done"""
+    body, status, headers = job_status_body(job_id)
+    return jsonify(body), status, headers
+
+@app.route('/api/py/metrics', methods=['GET'])
+def get_metrics():
+    """Latency histograms in the Prometheus text format"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/py/model-stats', methods=['GET'])
+def get_model_stats():
+    """Rolling latency/error stats and hedging counters per Gemini model"""
+    return jsonify(model.snapshot())
+
+@app.route('/api/py/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Response and web search cache hit/miss counters"""
+    return jsonify(dict(
+        response_cache.stats(),
+        sessions=session_store.stats(),
+        answer_store=answer_store.stats(),
+        paraphrase_index=paraphrase_index.stats(),
+        web_search=dict(search_cache.stats(), singleflight=search_flight.stats()),
+        llm_coalescing=coalescing_stats(generation_flight)
+    ))
+
+def readiness():
+    """(body, status) for the readiness probe.
+
+    Builds the Gemini and SerpAPI clients if this worker has not yet, so a
+    worker that reports ready has already paid for them. Gemini is
+    required; without SerpAPI voice search answers without web results.
+    """
+    checks = {}
+    ready = True
+    for name, client, required in (('gemini', model, True), ('serpapi', serpapi_client, False)):
+        if not isinstance(client, LazyClient):
+            checks[name] = {'loaded': True, 'stub': True}
+            continue
+        try:
+            client.get()
+        except Exception:
+            pass
+        checks[name] = client.status()
+        ready = ready and (client.loaded or not required)
+    # Reported, but an open breaker does not take the worker out of rotation:
+    # it is the upstream that is down, and requests already fail fast
+    checks['gemini']['breaker'] = gemini_breaker.stats()
+    checks['serpapi']['breaker'] = serpapi_breaker.stats()
+    checks['gemini']['api_key'] = bool(api_key) or 'stub' in checks['gemini']
+    ready = ready and checks['gemini']['api_key']
+    try:
+        checks['sessions'] = session_store.stats()
+    except Exception as e:
+        checks['sessions'] = {'error': str(e)}
+        ready = False
+    checks['answer_store'] = len(answer_store)
+    body = {'status': 'ready' if ready else 'not_ready', 'pid': os.getpid(), 'checks': checks}
+    return body, 200 if ready else 503
+
+@app.route('/api/py/health', methods=['GET'])
+def health():
+    """Liveness: the process is up and serving requests. Does no other work"""
+    return jsonify({'status': 'ok', 'uptime_seconds': round(time.monotonic() - STARTED_AT, 3)})
+
+@app.route('/api/py/ready', methods=['GET'])
+def ready():
+    """Readiness: this worker can answer chats (see readiness())"""
+    body, status = readiness()
+    return jsonify(body), status
+
+def preload_client_libraries():
+    """Import the Gemini and SerpAPI libraries without creating any client"""
+    import google.generativeai  # noqa: F401
+    import serpapi  # noqa: F401
+
+def create_app(preload_libraries=False):
+    """Application factory, for `gunicorn --preload 'app:create_app(preload_libraries=True)'`.
+
+    Importing this module does only cheap, fork-safe work: configuration,
+    caches, the pre-generated answers and the paraphrase index. With
+    --preload that runs once in the gunicorn master and workers share it
+    after fork. preload_libraries also imports the Gemini/SerpAPI libraries
+    there (most of the cold start). The clients themselves are built in
+    each worker on first use or by the readiness probe, never before a
+    fork, so no connection is shared between processes.
+    """
+    if preload_libraries:
+        start = time.perf_counter()
+        preload_client_libraries()
+        log_event('client_libraries_preloaded', seconds=round(time.perf_counter() - start, 3))
+    return app
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=port)
+    create_app().run(host='0.0.0.0', port=port)
@@ -0,0 +1,505 @@
+"""Async (ASGI) serving mode for the /api/py/* routes.
+
+The Flask app in app.py ties up one worker per in-flight Gemini or SerpAPI
+call. This Quart app exposes the same routes with the same request and
+response contracts, but awaits the upstream calls so one process can hold
+hundreds of conversations. Run it with:
+
+    hypercorn asgi:app --bind 0.0.0.0:$PORT
+
+Outbound Gemini calls are capped by LLM_MAX_CONCURRENCY (default 64).
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+import traceback
+
+from quart import Quart, Response, g, request, jsonify
+from quart.wrappers.response import DataBody
+from quart_cors import cors
+
+import app as finstra
+from deadline import Deadline
+from singleflight import AsyncSingleFlight
+from structured_log import log_event
+from response_encoding import (
+    MINIMAL_FIELDS, Compressor, compact_body, compact_chunk, compress, dump_compact
+)
+
+app = Quart(__name__)
+app = cors(app, allow_origin=finstra.allowed_origins)
+app.json.ensure_ascii = False
+
+stage_latency = finstra.stage_latency
+
+
+@app.before_request
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+async def observe_request_latency(response):
+    if request.endpoint and 'request_start' in g:
+        finstra.request_latency.observe(time.perf_counter() - g.request_start, request.endpoint)
+    return response
+
+
+async def encode_body(body, fields, compressor):
+    """Async counterpart of response_encoding.encode_chunks for streamed bodies"""
+    async with body as chunks:
+        async for chunk in chunks:
+            if fields is not None:
+                chunk = compact_chunk(chunk, fields)
+            if compressor is not None:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+    if compressor is not None:
+        yield compressor.finish()
+
+
+@app.after_request
+async def encode_api_response(response):
+    """Trimmed fields and gzip/brotli for /api/py/* (see app.encode_api_response)"""
+    if not request.path.startswith('/api/py/'):
+        return response
+    fields = finstra.trimmed_fields(request.endpoint, request.args.get('fields'), request.headers.get('Prefer'))
+    if fields is MINIMAL_FIELDS:
+        response.headers['Preference-Applied'] = 'return=minimal'
+    if request.endpoint in finstra.TRIMMABLE_ENDPOINTS:
+        response.vary.add('Prefer')
+    response.vary.add('Accept-Encoding')
+    streaming = not isinstance(response.response, DataBody)
+    encoding = finstra.negotiated_encoding(response, request.headers.get('Accept-Encoding'), streaming)
+
+    if streaming:
+        compressor = Compressor(encoding, finstra.GZIP_LEVEL, finstra.BROTLI_QUALITY) if encoding else None
+        if fields is not None or compressor is not None:
+            response.response = response.iterable_body_class(encode_body(response.response, fields, compressor))
+        if compressor is not None:
+            response.headers['Content-Encoding'] = encoding
+            response.headers.pop('Content-Length', None)
+        return response
+
+    if fields is not None and response.is_json:
+        response.set_data(dump_compact(compact_body(await response.get_json(), fields)))
+    data = await response.get_data()
+    if encoding and len(data) >= finstra.COMPRESS_MIN_BYTES:
+        response.set_data(compress(data, encoding, finstra.GZIP_LEVEL, finstra.BROTLI_QUALITY))
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+
+# Limit on concurrent generate_content calls so a burst of conversations
+# does not blow through the Gemini quota all at once.
+llm_semaphore = asyncio.Semaphore(int(os.getenv('LLM_MAX_CONCURRENCY', 64)))
+
+# Batch items in progress at once, across all batches
+batch_semaphore = asyncio.Semaphore(finstra.BATCH_CONCURRENCY)
+
+# Identical prompts in flight at the same time share one model call
+generation_flight = AsyncSingleFlight()
+
+
+async def _generate(prompt, timeout=None):
+    """Async app.call_gemini"""
+    options = {'timeout': timeout} if timeout is not None else {}
+    try:
+        async with llm_semaphore:
+            response = await finstra.model.generate_content_async(prompt, **options)
+    except Exception as e:
+        if finstra.is_gemini_outage(e, timeout):
+            finstra.gemini_breaker.record_failure()
+        raise
+    finstra.gemini_breaker.record_success()
+    return response.text
+
+
+def request_client():
+    return finstra.client_key(request.headers.get('X-Forwarded-For'), request.remote_addr)
+
+
+async def admit_client(client):
+    """app.admit_client on a worker thread: its SQLite transaction can wait on other workers' locks"""
+    if finstra.gemini_quota is not None and client:
+        await asyncio.to_thread(finstra.admit_client, client)
+
+
+async def generate_text(prompt, client=None, timeout=None):
+    """Async app.generate_text"""
+    finstra.gemini_breaker.check()
+    await admit_client(client)
+    key = finstra.response_cache.make_key(finstra.model._model_name, prompt)
+    return await generation_flight.do(key, lambda: _generate(prompt, timeout), timeout=timeout)
+
+
+async def start_chat(data, user_message, language):
+    """app.resolve_session and app.prepare_chat on a worker thread, as the session store may be SQLite.
+
+    Returns (session_id, chat_history, reply, plan).
+    """
+    def start():
+        session_id, chat_history = finstra.resolve_session(data)
+        reply, plan = finstra.prepare_chat(user_message, language, chat_history, session_id)
+        return session_id, chat_history, reply, plan
+    return await asyncio.to_thread(start)
+
+
+async def queue_chat_generation(plan):
+    """app.queue_chat_generation and app.queued_body, on a worker thread as the job store may be SQLite"""
+    def queue():
+        return finstra.queued_body(finstra.queue_chat_generation(plan))
+    return await asyncio.to_thread(queue)
+
+
+async def web_lookup(input_text, deadline=None):
+    """Async app.web_lookup; the blocking SerpAPI call runs on app's search executor"""
+    with stage_latency.time('voice_search', 'web_search'):
+        if not finstra.needs_web_search(input_text):
+            return False, None
+        if finstra.gemini_breaker.is_open:
+            return True, None
+        lookup = finstra.start_web_search(input_text, deadline)
+        if lookup is None:
+            return True, None
+        timeout = finstra.web_search_timeout(deadline)
+        # asyncio.wait rather than wait_for: the lookup is shared with other
+        # requests and must not be cancelled when this one stops waiting
+        done, _ = await asyncio.wait({asyncio.wrap_future(lookup)}, timeout=timeout)
+        if not done:
+            finstra.web_search_timed_out(timeout)
+            return True, None
+        return True, done.pop().result()
+
+
+async def stream_response(prompt, cache_key, final_payload, on_complete=None, client=None, endpoint='stream'):
+    """Async counterpart of app.stream_response, with the same first_chunk and llm_call stages"""
+    cached_text = finstra.response_cache.get(cache_key) if cache_key else None
+    if cached_text is not None:
+        if on_complete:
+            await asyncio.to_thread(on_complete, cached_text)
+        yield finstra.sse_event({'delta': cached_text})
+        yield finstra.sse_event(dict(final_payload, status='success'), event='done')
+        return
+
+    cleaner = finstra.StreamingCleaner()
+    parts = []
+    start = time.perf_counter()
+    try:
+        with stage_latency.time(endpoint, 'llm_call'):
+            finstra.gemini_breaker.check()
+            await admit_client(client)
+            async with llm_semaphore:
+                response = await finstra.model.generate_content_async(prompt, stream=True)
+                async for chunk in response:
+                    try:
+                        chunk_text = chunk.text
+                    except ValueError:
+                        continue
+                    delta = cleaner.feed(chunk_text)
+                    if delta:
+                        if not parts:
+                            stage_latency.observe(time.perf_counter() - start, endpoint, 'first_chunk')
+                        parts.append(delta)
+                        yield finstra.sse_event({'delta': delta})
+            delta = cleaner.finish()
+            if delta:
+                if not parts:
+                    stage_latency.observe(time.perf_counter() - start, endpoint, 'first_chunk')
+                parts.append(delta)
+                yield finstra.sse_event({'delta': delta})
+    except Exception as e:
+        log_event('gemini_stream_error', level=logging.ERROR, error=str(e), sent_parts=len(parts))
+        if finstra.is_gemini_outage(e):
+            finstra.gemini_breaker.record_failure()
+        if finstra.is_queueable_rate_limit(e) and not parts:
+            try:
+                job_id = await asyncio.to_thread(
+                    finstra.queue_generation, prompt, cache_key, final_payload, on_complete
+                )
+            except finstra.JobQueueFull as full:
+                e = full
+            else:
+                yield finstra.sse_event({
+                    'job_id': job_id,
+                    'poll_url': f"/api/py/jobs/{job_id}",
+                    'status': 'queued'
+                }, event='queued')
+                return
+        body = {'error': finstra.clean_response(str(e)), 'code': finstra.error_status(e), 'status': 'error'}
+        if finstra.retry_after_seconds(e) is not None:
+            body['retry_after'] = finstra.retry_after_seconds(e)
+        yield finstra.sse_event(body, event='error')
+        return
+
+    if not parts:
+        yield finstra.sse_event({
+            'error': "Sorry, I couldn't generate a response. Please try again.",
+            'status': 'error'
+        }, event='error')
+        return
+
+    finstra.gemini_breaker.record_success()
+    if cache_key:
+        finstra.response_cache.set(cache_key, ''.join(parts))
+    if on_complete:
+        # Records the turn in the session store
+        await asyncio.to_thread(on_complete, ''.join(parts))
+    yield finstra.sse_event(dict(final_payload, status='success'), event='done')
+
+
+async def reply_events(reply):
+    """Async app.reply_events"""
+    for event in finstra.reply_events(reply):
+        yield event
+
+
+def sse_response(events):
+    response = Response(events, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.timeout = None
+    return response
+
+
+@app.route('/api/py/search', methods=['POST'])
+async def voice_search():
+    """Voice search endpoint with multilingual support, answered within app.VOICE_SEARCH_DEADLINE"""
+    deadline = Deadline(finstra.VOICE_SEARCH_DEADLINE)
+    try:
+        with stage_latency.time('voice_search', 'json_parse'):
+            data = await request.get_json()
+        input_text = data.get('text', '')
+        language = data.get('language', 'english')
+
+        realtime, web_snippet = await web_lookup(input_text, deadline)
+        reply, plan = finstra.prepare_search(input_text, language, web_snippet, realtime)
+        log_event(
+            'voice_search', sample=True, language=language, input_chars=len(input_text),
+            realtime=realtime, web_snippet=web_snippet is not None, cached=reply is not None
+        )
+        if reply:
+            return jsonify(reply)
+
+        try:
+            with stage_latency.time('voice_search', 'llm_call'):
+                text = await generate_text(plan['prompt'], client=request_client(), timeout=deadline.remaining())
+            return jsonify(finstra.finish_search(plan, text))
+        except Exception as e:
+            log_event('gemini_error', level=logging.ERROR, endpoint='voice_search', error=str(e))
+            return jsonify(finstra.search_error_body(language))
+
+    except Exception as e:
+        log_event('voice_search_error', level=logging.ERROR, error=str(e))
+        error_message = f"Error processing voice search: {str(e)}"
+        return jsonify({
+            "response": finstra.clean_response(error_message),
+            "language": "english",
+            "status": "error"
+        })
+
+
+@app.route('/api/py/search/stream', methods=['POST'])
+async def voice_search_stream():
+    """Streaming voice search: cleaned answer chunks as Server-Sent Events"""
+    data = await request.get_json() or {}
+    input_text = data.get('text', '')
+    language = data.get('language', 'english')
+
+    try:
+        realtime, web_snippet = await web_lookup(input_text, Deadline(finstra.VOICE_SEARCH_DEADLINE))
+        reply, plan = finstra.prepare_search(input_text, language, web_snippet, realtime)
+    except Exception as e:
+        log_event('voice_search_error', level=logging.ERROR, error=str(e))
+
+        async def error_events():
+            yield finstra.sse_event({
+                'error': finstra.clean_response(f"Error processing voice search: {str(e)}"),
+                'status': 'error'
+            }, event='error')
+        return sse_response(error_events())
+
+    if reply:
+        return sse_response(reply_events(reply))
+    return sse_response(stream_response(
+        plan['prompt'], plan['cache_key'], {'language': language},
+        client=request_client(), endpoint='voice_search_stream'
+    ))
+
+
+@app.route('/api/py/chat', methods=['POST'])
+async def chat():
+    try:
+        with stage_latency.time('chat', 'json_parse'):
+            data = await request.get_json()
+        user_message = data.get('message', '')
+        language = data.get('language', 'english')
+        session_id, chat_history, reply, plan = await start_chat(data, user_message, language)
+        finstra.log_chat_request(session_id, language, chat_history, plan, reply)
+        if reply:
+            return jsonify(reply)
+
+        try:
+            with stage_latency.time('chat', 'llm_call'):
+                text = await generate_text(plan['prompt'], client=request_client())
+        except Exception as e:
+            if not finstra.is_queueable_rate_limit(e):
+                raise
+            log_event('chat_rate_limited', level=logging.WARNING, session_id=session_id)
+            body, headers = await queue_chat_generation(plan)
+            return jsonify(body), 202, headers
+
+        return jsonify(await asyncio.to_thread(finstra.finish_chat, plan, text))
+
+    except finstra.SessionExpired as e:
+        log_event('chat_session_expired', session_id=e.session_id)
+        body, status = finstra.chat_error_body(e, None)
+        return jsonify(body), status
+
+    except Exception as e:
+        error_traceback = traceback.format_exc()
+        log_event('chat_error', level=logging.ERROR, error=str(e), traceback=error_traceback)
+        body, status = finstra.chat_error_body(e, error_traceback)
+        return jsonify(body), status, finstra.rate_limit_headers(e)
+
+
+@app.route('/api/py/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Streaming chat: cleaned answer chunks as Server-Sent Events"""
+    data = await request.get_json() or {}
+    user_message = data.get('message', '')
+    language = data.get('language', 'english')
+    try:
+        session_id, chat_history, reply, plan = await start_chat(data, user_message, language)
+    except finstra.SessionExpired as e:
+        log_event('chat_session_expired', session_id=e.session_id)
+        body, status = finstra.chat_error_body(e, None)
+
+        async def expired_events():
+            yield finstra.sse_event(dict(body, code=status), event='error')
+        return sse_response(expired_events())
+    finstra.log_chat_request(session_id, language, chat_history, plan, reply)
+    if reply:
+        return sse_response(reply_events(reply))
+
+    return sse_response(stream_response(
+        plan['prompt'], plan['cache_key'], {'suggestions': plan['suggestions'], 'session_id': session_id},
+        lambda answer: finstra.remember_chat_answer(plan, answer),
+        client=request_client(), endpoint='chat_stream'
+    ))
+
+
+async def chat_item(index, item, client=None):
+    """Async app.chat_item. Returns (index, body, status code)"""
+    error = finstra.batch_item_error(item)
+    if error:
+        return index, error, 400
+    async with batch_semaphore:
+        try:
+            language = item.get('language', 'english')
+            session_id, chat_history, reply, plan = await start_chat(item, item['message'], language)
+            if reply:
+                return index, reply, 200
+            try:
+                with stage_latency.time('chat_batch', 'llm_call'):
+                    text = await generate_text(plan['prompt'], client=client)
+            except Exception as e:
+                if not finstra.is_queueable_rate_limit(e):
+                    raise
+                body, _ = await queue_chat_generation(plan)
+                return index, body, 202
+            return index, await asyncio.to_thread(finstra.finish_chat, plan, text), 200
+        except Exception as e:
+            log_event('chat_batch_item_error', level=logging.ERROR, error=str(e))
+            body, status = finstra.chat_error_body(e, traceback.format_exc())
+            return index, body, status
+
+
+@app.route('/api/py/chat/batch', methods=['POST'])
+async def chat_batch():
+    """Answer many chat messages in one request (see app.chat_batch)"""
+    data = await request.get_json(silent=True) or {}
+    items, error = finstra.parse_batch(data)
+    if error:
+        return jsonify(error), 400
+    log_event('chat_batch', sample=True, items=len(items))
+
+    client = request_client()
+    tasks = [asyncio.ensure_future(chat_item(index, item, client)) for index, item in enumerate(items)]
+
+    if finstra.wants_ndjson(data, request.headers.get('Accept')):
+        async def lines():
+            results = []
+            for next_done in asyncio.as_completed(tasks):
+                index, body, status = await next_done
+                result = finstra.batch_item_body(index, items[index], body, status)
+                results.append(result)
+                yield json.dumps(result, ensure_ascii=False) + '\n'
+            yield json.dumps(dict(finstra.batch_summary(results), status='done')) + '\n'
+        response = Response(lines(), mimetype='application/x-ndjson')
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.timeout = None
+        return response
+
+    results = [None] * len(items)
+    for index, body, status in await asyncio.gather(*tasks):
+        results[index] = finstra.batch_item_body(index, items[index], body, status)
+    return jsonify(dict(finstra.batch_summary(results), results=results, status='success'))
+
+
+@app.route('/api/py/common-questions', methods=['GET'])
+async def get_common_questions():
+    if request.if_none_match.contains_weak(finstra.COMMON_QUESTIONS_ETAG):
+        return '', 304, finstra.common_questions_headers()
+    return jsonify(finstra.COMMON_QUESTIONS), 200, finstra.common_questions_headers()
+
+
+@app.route('/api/py/jobs/<job_id>', methods=['GET'])
+async def get_job(job_id):
+    # With JOB_STORE=sqlite the job is read from the shared file
+    body, status, headers = await asyncio.to_thread(finstra.job_status_body, job_id)
+    return jsonify(body), status, headers
+
+
+@app.route('/api/py/health', methods=['GET'])
+async def health():
+    return jsonify({'status': 'ok', 'uptime_seconds': round(time.monotonic() - finstra.STARTED_AT, 3)})
+
+
+@app.route('/api/py/ready', methods=['GET'])
+async def ready():
+    # The first probe in a worker builds the clients, which blocks for a moment
+    body, status = await asyncio.to_thread(finstra.readiness)
+    return jsonify(body), status
+
+
+@app.route('/api/py/metrics', methods=['GET'])
+async def get_metrics():
+    return Response(finstra.render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/api/py/model-stats', methods=['GET'])
+async def get_model_stats():
+    # The snapshot reads the shared quota's SQLite file
+    return jsonify(await asyncio.to_thread(finstra.model.snapshot))
+
+
+@app.route('/api/py/cache-stats', methods=['GET'])
+async def get_cache_stats():
+    # The session stats may read the shared SQLite file
+    sessions = await asyncio.to_thread(finstra.session_store.stats)
+    return jsonify(dict(
+        finstra.response_cache.stats(),
+        sessions=sessions,
+        answer_store=finstra.answer_store.stats(),
+        paraphrase_index=finstra.paraphrase_index.stats(),
+        web_search=dict(finstra.search_cache.stats(), singleflight=finstra.search_flight.stats()),
+        llm_coalescing=finstra.coalescing_stats(generation_flight)
+    ))
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=finstra.port)
@@ -0,0 +1,112 @@
+"""Benchmark: bytes on the wire and CPU cost of the response encodings.
+
+Compares a chat response as it was sent before (\\u-escaped JSON), as
+UTF-8 JSON, and trimmed with Prefer: return=minimal, under gzip and brotli
+at several levels, plus a streamed answer compressed event by event.
+
+Usage: python bench_compression.py [iterations]
+"""
+import json
+import sys
+import time
+
+from response_encoding import (
+    MINIMAL_FIELDS, Compressor, brotli, compact_body, compress, dump_compact, encode_chunks
+)
+
+ANSWERS = {
+    'english': (
+        "Saving a little every week is like storing grain after harvest. Open a savings account at your "
+        "nearest bank or post office with your Aadhaar card and a photo. Set aside a fixed amount, even "
+        "50 rupees, on the day you get paid, and consider a recurring deposit so the habit runs itself.\n\n"
+        "Never share your OTP or PIN with anyone who calls you, even if they say they are from the bank."
+    ),
+    'hindi': (
+        "हर हफ्ते थोड़ी बचत करना फसल के बाद अनाज जमा करने जैसा है। अपने आधार कार्ड और फोटो के साथ "
+        "नजदीकी बैंक या डाकघर में बचत खाता खोलें। जिस दिन पैसे मिलें, उसी दिन एक तय रकम, चाहे 50 रुपये "
+        "ही क्यों न हो, अलग रख दें और आवर्ती जमा (RD) पर विचार करें।\n\n"
+        "कोई भी फोन करके OTP या PIN मांगे तो कभी न बताएं, चाहे वह खुद को बैंक का कर्मचारी बताए।"
+    ),
+    'bengali': (
+        "প্রতি সপ্তাহে একটু করে সঞ্চয় করা ফসল তোলার পরে শস্য জমিয়ে রাখার মতো। আধার কার্ড ও ছবি নিয়ে "
+        "কাছের ব্যাংক বা ডাকঘরে একটি সঞ্চয় অ্যাকাউন্ট খুলুন। যেদিন টাকা পান, সেদিনই একটা নির্দিষ্ট অঙ্ক, "
+        "৫০ টাকা হলেও, আলাদা করে রাখুন।\n\n"
+        "কেউ ফোন করে OTP বা PIN চাইলে কখনও বলবেন না, সে নিজেকে ব্যাংকের লোক বললেও।"
+    ),
+}
+
+SUGGESTIONS = {
+    'english': ["How do I open a bank account?", "What is a recurring deposit?", "How to avoid UPI fraud?"],
+    'hindi': ["बैंक खाता कैसे खोलें?", "आवर्ती जमा क्या है?", "UPI धोखाधड़ी से कैसे बचें?"],
+    'bengali': ["ব্যাংক অ্যাকাউন্ট কিভাবে খুলবেন?", "রেকারিং ডিপোজিট কী?", "UPI প্রতারণা থেকে কিভাবে বাঁচবেন?"],
+}
+
+ENCODINGS = [('gzip', 1), ('gzip', 6), ('gzip', 9)] + (
+    [('br', 1), ('br', 5), ('br', 11)] if brotli is not None else []
+)
+
+
+def chat_body(language):
+    return {
+        'response': ANSWERS[language],
+        'suggestions': SUGGESTIONS[language],
+        'suggestion_category': 'savings',
+        'session_id': '5ce9f446a297437682ee100679e3cb4f',
+        'scam_detected': False,
+        'status': 'success',
+    }
+
+
+def cpu_us(fn, iterations):
+    start = time.process_time()
+    for _ in range(iterations):
+        fn()
+    return (time.process_time() - start) / iterations * 1e6
+
+
+def encode(data, encoding, level):
+    return compress(data, encoding, gzip_level=level, brotli_quality=level)
+
+
+def sse_events(text, size=80):
+    events = [f"data: {json.dumps({'delta': text[i:i + size]}, ensure_ascii=False)}\n\n"
+              for i in range(0, len(text), size)]
+    return events + ['event: done\ndata: {"status": "success"}\n\n']
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    if brotli is None:
+        print("brotli is not installed, only gzip is measured")
+    header = f"{'body':<22}{'identity':>9}" + ''.join(f"{f'{e}-{l}':>16}" for e, l in ENCODINGS)
+    print(f"Bytes (CPU us per response), {iterations} iterations\n{header}")
+    for language in ANSWERS:
+        body = chat_body(language)
+        variants = [
+            ('escaped', json.dumps(body).encode('utf-8')),
+            ('utf-8', dump_compact(body).encode('utf-8')),
+            ('minimal', dump_compact(compact_body(body, MINIMAL_FIELDS)).encode('utf-8')),
+        ]
+        for name, data in variants:
+            row = f"{f'{language} {name}':<22}{len(data):>9}"
+            for encoding, level in ENCODINGS:
+                size = len(encode(data, encoding, level))
+                cost = cpu_us(lambda: encode(data, encoding, level), iterations)
+                row += f"{f'{size} ({cost:.0f})':>16}"
+            print(row)
+
+    print("\nStreamed answer (SSE), flushed after every event vs compressed whole")
+    for language in ANSWERS:
+        events = sse_events(ANSWERS[language] * 3)
+        raw = ''.join(events).encode('utf-8')
+        row = f"{language:<10}{len(raw):>7} raw"
+        for encoding, level in [('gzip', 6)] + ([('br', 5)] if brotli is not None else []):
+            streamed = sum(len(c) for c in encode_chunks(events, compressor=Compressor(encoding, level, level)))
+            cost = cpu_us(lambda: list(encode_chunks(events, compressor=Compressor(encoding, level, level))),
+                          iterations)
+            row += f"   {encoding}-{level}: {streamed} streamed ({cost:.0f} us), {len(encode(raw, encoding, level))} whole"
+        print(row)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,358 @@
+"""Load test: replay mixed traffic against the backend routes with stub Gemini and SerpAPI.
+
+By default the Flask app from app.py runs in-process, with the model
+replaced by a ModelRouter over StubModels and its SerpAPI client by
+StubSerpAPI (see stub_models.py), so no quota is used and latencies are
+repeatable.
+--concurrency client threads stand in for one gthread worker's threads.
+With --url the same traffic is sent over HTTP to a running server
+instead. That server can be a gunicorn with the stubs installed, for
+sizing workers:
+
+    gunicorn -w 2 -k gthread --threads 8 'bench_load:stub_app()'
+    python bench_load.py --url http://127.0.0.1:8000 --concurrency 32
+
+The traffic mixes multi-turn chats that continue their session, voice
+searches (some with real-time keywords, which trigger a web lookup), and
+common-questions fetches. The report gives throughput, p50/p95/p99
+latency and error rate per endpoint. Each run is saved as JSON under
+--out, and --compare prints the change against an earlier run.
+
+Usage: python bench_load.py [--requests N] [--concurrency N] [--llm-latency S]
+                            [--rate-limit-ratio R] [--label NAME] [--compare FILE]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CHAT_TOPICS = [
+    "save money for my daughter's wedding",
+    "open a bank account in my village",
+    "get a loan to buy a tractor",
+    "choose crop insurance",
+    "pay the milk vendor with UPI",
+    "start a recurring deposit",
+    "check my credit score",
+    "invest small amounts every month",
+    "get a Kisan Credit Card",
+    "avoid falling into a moneylender's debt trap",
+]
+CHAT_TEMPLATES = [
+    "How do I {}?",
+    "What is the best way to {}?",
+    "Can you explain how to {}?",
+]
+HINDI_CHAT_MESSAGES = [
+    "पैसे कैसे बचाएं?",
+    "बैंक खाता कैसे खोलें?",
+    "फसल बीमा क्या है?",
+    "किसान क्रेडिट कार्ड के लिए आवेदन कैसे करें?",
+]
+FOLLOW_UPS = [
+    "Can you explain that more simply?",
+    "What documents do I need?",
+    "How much interest will I pay?",
+    "Is there a government scheme for this?",
+    "What should I do first?",
+]
+SEARCH_QUERIES = [
+    "what is a fixed deposit",
+    "how does a savings account work",
+    "what is compound interest",
+    "how to use UPI safely",
+    "what is a mutual fund",
+    "how to read a bank passbook",
+]
+REALTIME_QUERIES = [
+    "gold price today",
+    "current repo rate",
+    "latest news on PM Kisan",
+    "fixed deposit rates now",
+    "आज सोने का भाव",
+]
+
+# Share of each request type in the mix
+DEFAULT_MIX = {'chat': 0.5, 'voice_search': 0.35, 'common_questions': 0.15}
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def install_stubs(llm_latency=0.8, llm_jitter=0.3, slow_ratio=0.02, slow_latency=5.0,
+                  rate_limit_ratio=0.0, response_chars=1500, serp_latency=0.6, seed=1):
+    """Import app.py with its Gemini and SerpAPI clients replaced by the local stubs"""
+    os.environ.setdefault('LOG_SAMPLE_RATE', '0')
+    os.environ.setdefault('LOG_LEVEL', 'ERROR')
+    import app as finstra
+    from model_router import ModelRouter
+    from stub_models import StubModel, StubSerpAPI
+
+    # Routed like build_model_router, so hedging, failover and the quota
+    # limiter are part of what is measured
+    finstra.model = ModelRouter(
+        [StubModel(
+            name, latency=llm_latency, jitter=llm_jitter, slow_ratio=slow_ratio,
+            slow_latency=slow_latency, rate_limit_ratio=rate_limit_ratio,
+            response_chars=response_chars, seed=seed + i
+        ) for i, name in enumerate(finstra.GEMINI_MODELS)],
+        default_hedge_delay=float(os.getenv('HEDGE_DEFAULT_DELAY', 4)),
+        min_samples=int(os.getenv('HEDGE_MIN_SAMPLES', 20)),
+        limiter=finstra.gemini_quota,
+        max_quota_wait=float(os.getenv('GEMINI_QUOTA_MAX_WAIT', 2))
+    )
+    serp = StubSerpAPI(latency=serp_latency, seed=seed)
+    finstra.serpapi_client = serp
+    return finstra, serp
+
+
+def stub_app():
+    """WSGI app with the default stubs installed, for running under gunicorn"""
+    finstra, _ = install_stubs()
+    return finstra.app
+
+
+class InProcessClient:
+    """Send requests through Flask's test client, one client per thread"""
+
+    def __init__(self, flask_app):
+        self.app = flask_app
+        self._local = threading.local()
+
+    def request(self, method, path, body=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=body)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    def __init__(self, base_url, timeout=60):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def request(self, method, path, body=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(
+            self.base_url + path, data=data, method=method,
+            headers={'Content-Type': 'application/json'} if data else {}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as response:
+                status, raw = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, raw = e.code, e.read()
+        try:
+            return status, json.loads(raw)
+        except ValueError:
+            return status, None
+
+
+class Traffic:
+    """Generates the request mix; chat conversations continue across requests by session_id"""
+
+    def __init__(self, mix, realtime_ratio, new_chat_ratio, max_turns, seed):
+        self.mix = mix
+        self.realtime_ratio = realtime_ratio
+        self.new_chat_ratio = new_chat_ratio
+        self.max_turns = max_turns
+        self._random = random.Random(seed)
+        self._idle_conversations = []
+        self._lock = threading.Lock()
+
+    def next_request(self):
+        """Return (endpoint, method, path, body, conversation)"""
+        with self._lock:
+            endpoint = self._random.choices(list(self.mix), weights=list(self.mix.values()))[0]
+            if endpoint == 'chat':
+                return ('chat', 'POST', '/api/py/chat') + self._chat_body()
+            if endpoint == 'voice_search':
+                realtime = self._random.random() < self.realtime_ratio
+                text = self._random.choice(REALTIME_QUERIES if realtime else SEARCH_QUERIES)
+                return 'voice_search', 'POST', '/api/py/search', {'text': text, 'language': 'english'}, None
+            return 'common_questions', 'GET', '/api/py/common-questions', None, None
+
+    def _chat_body(self):
+        if self._idle_conversations and self._random.random() >= self.new_chat_ratio:
+            conversation = self._idle_conversations.pop(self._random.randrange(len(self._idle_conversations)))
+            message = self._random.choice(FOLLOW_UPS)
+        else:
+            language = 'hindi' if self._random.random() < 0.2 else 'english'
+            conversation = {'session_id': None, 'turns': 0, 'language': language}
+            if language == 'hindi':
+                message = self._random.choice(HINDI_CHAT_MESSAGES)
+            else:
+                message = self._random.choice(CHAT_TEMPLATES).format(self._random.choice(CHAT_TOPICS))
+        body = {'message': message, 'language': conversation['language']}
+        if conversation['session_id']:
+            body['session_id'] = conversation['session_id']
+        else:
+            body['chat_history'] = [{'sender': 'user', 'message': message}]
+        return body, conversation
+
+    def finished(self, conversation, response_body):
+        """Return a chat conversation to the pool so a later request continues it"""
+        if conversation is None:
+            return
+        conversation['turns'] += 1
+        if response_body and response_body.get('session_id'):
+            conversation['session_id'] = response_body['session_id']
+        if conversation['turns'] < self.max_turns:
+            with self._lock:
+                self._idle_conversations.append(conversation)
+
+
+def is_error(status, body):
+    if status >= 400:
+        return True
+    return bool(body) and isinstance(body, dict) and body.get('status') == 'error'
+
+
+def run_load(client, traffic, total_requests, concurrency):
+    samples = []
+    counter = iter(range(total_requests))
+    counter_lock = threading.Lock()
+    samples_lock = threading.Lock()
+
+    def worker():
+        while True:
+            with counter_lock:
+                if next(counter, None) is None:
+                    return
+            endpoint, method, path, body, conversation = traffic.next_request()
+            start = time.perf_counter()
+            try:
+                status, response_body = client.request(method, path, body)
+            except Exception as e:
+                status, response_body = 599, {'error': str(e)}
+            elapsed = time.perf_counter() - start
+            traffic.finished(conversation, response_body)
+            with samples_lock:
+                samples.append((endpoint, elapsed, status, is_error(status, response_body)))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(worker)
+    return samples, time.perf_counter() - start
+
+
+def summarize(samples, wall_seconds):
+    """Per-endpoint throughput, latency percentiles (ms) and error/queued rates"""
+    groups = {}
+    for endpoint, elapsed, status, error in samples:
+        groups.setdefault(endpoint, []).append((elapsed, status, error))
+    groups['all'] = [(elapsed, status, error) for _, elapsed, status, error in samples]
+
+    report = {}
+    for endpoint, rows in groups.items():
+        latencies = [elapsed for elapsed, _, _ in rows]
+        report[endpoint] = {
+            'requests': len(rows),
+            'throughput_rps': round(len(rows) / wall_seconds, 2),
+            'p50_ms': round(percentile(latencies, 0.5) * 1000, 1),
+            'p95_ms': round(percentile(latencies, 0.95) * 1000, 1),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 1),
+            'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1),
+            'error_rate': round(sum(1 for _, _, error in rows if error) / len(rows), 4),
+            'queued_rate': round(sum(1 for _, status, _ in rows if status == 202) / len(rows), 4),
+        }
+    return report
+
+
+def print_report(report, previous=None):
+    columns = ['requests', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'error_rate', 'queued_rate']
+    print(f"{'endpoint':<18}" + ''.join(f"{c:>15}" for c in columns))
+    for endpoint, row in sorted(report.items(), key=lambda item: item[0] == 'all'):
+        print(f"{endpoint:<18}" + ''.join(f"{row[c]:>15}" for c in columns))
+        if previous and endpoint in previous:
+            deltas = []
+            for c in columns[1:5]:
+                before = previous[endpoint][c]
+                change = (row[c] - before) / before * 100 if before else 0.0
+                deltas.append(f"{change:>+14.1f}%")
+            print(f"{'  vs previous':<18}{'':>15}" + ''.join(deltas))
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--url', help="send traffic to a running server instead of the in-process app")
+    parser.add_argument('--llm-latency', type=float, default=0.8, help="stub Gemini latency in seconds")
+    parser.add_argument('--llm-jitter', type=float, default=0.3)
+    parser.add_argument('--slow-ratio', type=float, default=0.02, help="share of Gemini calls in the slow tail")
+    parser.add_argument('--slow-latency', type=float, default=5.0)
+    parser.add_argument('--rate-limit-ratio', type=float, default=0.0, help="share of Gemini calls failing with 429")
+    parser.add_argument('--response-chars', type=int, default=1500)
+    parser.add_argument('--serp-latency', type=float, default=0.6, help="stub SerpAPI latency in seconds")
+    parser.add_argument('--realtime-ratio', type=float, default=0.4, help="share of voice searches with real-time keywords")
+    parser.add_argument('--new-chat-ratio', type=float, default=0.4, help="share of chat requests starting a conversation")
+    parser.add_argument('--max-turns', type=int, default=6)
+    parser.add_argument('--no-cache', action='store_true', help="disable the response and web search caches")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--label', default='', help="name added to the saved result file")
+    parser.add_argument('--out', default='bench_results', help="directory for the saved results")
+    parser.add_argument('--compare', help="earlier result file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.no_cache:
+        os.environ['RESPONSE_CACHE_SIZE'] = '0'
+        os.environ['SERPAPI_CACHE_SIZE'] = '0'
+
+    finstra = serp = None
+    if args.url:
+        client = HttpClient(args.url)
+    else:
+        finstra, serp = install_stubs(
+            llm_latency=args.llm_latency, llm_jitter=args.llm_jitter, slow_ratio=args.slow_ratio,
+            slow_latency=args.slow_latency, rate_limit_ratio=args.rate_limit_ratio,
+            response_chars=args.response_chars, serp_latency=args.serp_latency, seed=args.seed
+        )
+        client = InProcessClient(finstra.app)
+
+    traffic = Traffic(DEFAULT_MIX, args.realtime_ratio, args.new_chat_ratio, args.max_turns, args.seed)
+    samples, wall_seconds = run_load(client, traffic, args.requests, args.concurrency)
+    report = summarize(samples, wall_seconds)
+
+    previous = None
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            previous = json.load(f)['results']
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {wall_seconds:.1f}s")
+    print_report(report, previous)
+
+    result = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': vars(args),
+        'wall_seconds': round(wall_seconds, 3),
+        'results': report,
+    }
+    if finstra is not None:
+        gemini_calls = sum(stub.calls for stub in finstra.model.models)
+        result['upstream_calls'] = {'gemini': gemini_calls, 'serpapi': serp.calls}
+        result['cache'] = finstra.response_cache.stats()
+        print(f"Upstream calls: gemini={gemini_calls} serpapi={serp.calls}")
+
+    os.makedirs(args.out, exist_ok=True)
+    name = time.strftime('load-%Y%m%d-%H%M%S') + (f"-{args.label}" if args.label else '') + '.json'
+    path = os.path.join(args.out, name)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"Saved {path}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
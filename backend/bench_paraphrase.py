@@ -0,0 +1,100 @@
+"""Benchmark: QuestionIndex insert and lookup latency at 100k entries.
+
+Usage: python bench_paraphrase.py [entries] [lookups]
+"""
+import random
+import sys
+import time
+import tracemalloc
+
+from question_index import QuestionIndex
+from transliterate import romanize
+
+TEMPLATES = [
+    "how to {}", "what is {}", "how do I {}", "can you explain {}", "is it safe to {}",
+    "कैसे करें {}", "{} क्या है", "{} কিভাবে করবেন",
+]
+WORDS = (
+    "save money bank account loan insurance crop deposit fixed recurring interest rate upi payment "
+    "kisan credit card gold pension scheme tractor cow milk seed fertilizer mobile wallet otp pin "
+    "aadhaar pan kyc branch atm cash cheque passbook mutual fund share market tax subsidy daughter "
+    "wedding education hospital village shop harvest rain season debt repay emi mortgage land"
+).split()
+
+
+def synthetic_words(rng, count):
+    """Made-up words standing in for the long tail of names, places and crops"""
+    syllables = [c + v for c in 'bcdfghjklmnprstvy' for v in 'aeiou']
+    return [''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def make_question(rng, vocabulary):
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(3, 7))]
+    return rng.choice(TEMPLATES).format(' '.join(words))
+
+
+def paraphrase(rng, question):
+    words = question.split()
+    if len(words) > 3:
+        words.pop(rng.randrange(len(words)))
+    words.insert(rng.randrange(len(words) + 1), rng.choice(['please', 'my', 'the', 'now']))
+    return ' '.join(words)
+
+
+def index_memory(rng, vocabulary, sample):
+    """Bytes per entry, measured on a smaller index (tracemalloc slows inserts a lot)"""
+    tracemalloc.start()
+    index = QuestionIndex(max_entries=sample)
+    for i in range(sample):
+        index.add('english', make_question(rng, vocabulary), f"answer {i}")
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used / sample
+
+
+def percentiles(latencies):
+    latencies = sorted(latencies)
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return f"p50 {pick(0.5):.2f} ms  p95 {pick(0.95):.2f} ms  p99 {pick(0.99):.2f} ms"
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    lookups = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    rng = random.Random(7)
+    vocabulary = WORDS + synthetic_words(rng, 3000)
+    questions = [make_question(rng, vocabulary) for _ in range(entries)]
+
+    # threshold 0 so every lookup reports its best match
+    index = QuestionIndex(max_entries=entries, threshold=0.0)
+    start = time.perf_counter()
+    for i, question in enumerate(questions):
+        index.add('english', question, f"answer {i}")
+    insert_seconds = time.perf_counter() - start
+    memory = index_memory(rng, vocabulary, min(entries, 10000)) * entries
+    print(f"Inserted {entries} entries in {insert_seconds:.1f}s "
+          f"({entries / insert_seconds:,.0f}/s), index memory ~{memory / 2**20:.0f} MiB (extrapolated)")
+
+    sources = rng.sample(questions, lookups)
+    for label, queries in [
+        ('paraphrase of an entry', [(paraphrase(rng, source), source) for source in sources]),
+        ('unseen question', [(make_question(rng, vocabulary), None) for _ in range(lookups)]),
+    ]:
+        latencies, found = [], 0
+        for query, source in queries:
+            start = time.perf_counter()
+            match = index.lookup('english', query)
+            latencies.append(time.perf_counter() - start)
+            found += source is not None and match[2] == romanize(source)
+        recall = f"  top match is the source: {found / lookups:.0%}" if label.startswith('paraphrase') else ''
+        print(f"{label:<24} {percentiles(latencies)}{recall}")
+
+    start = time.perf_counter()
+    for i in range(entries // 10):
+        index.add('english', make_question(rng, vocabulary), f"extra {i}")
+    print(f"{entries // 10} more inserts with eviction: {time.perf_counter() - start:.1f}s, "
+          f"size {len(index)}, evictions {index.evictions}")
+
+
+if __name__ == '__main__':
+    main()
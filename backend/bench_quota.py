@@ -0,0 +1,142 @@
+"""Benchmark: several worker processes sharing one Gemini quota, with and without SharedQuota.
+
+A stand-in for Gemini enforces --quota-rpm across all processes (a token
+bucket in shared memory holding one second's worth) and answers with a
+429 once it is spent. Each worker process runs --threads request threads
+that keep calling it through a ModelRouter, on behalf of one heavy
+client (--heavy-share of the traffic) and a few light ones.
+
+Without the limiter a thread that gets a 429 backs off and retries, as
+the job queue would. With it, requests wait for or skip the shared
+budget, so the upstream sees few or no 429s, and each client is held to
+its own share.
+
+Usage: python bench_quota.py [--workers 4] [--threads 4] [--seconds 10] [--quota-rpm 600]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from model_router import ModelRouter
+from quota_limiter import QuotaExceeded, SharedQuota
+from stub_models import StubRateLimitError, StubResponse
+
+LIGHT_CLIENTS = 5
+
+
+class QuotaStubModel:
+    """Instant stub model that enforces a quota shared by all processes"""
+
+    def __init__(self, tokens, updated_at, lock, rpm, model_name='models/stub'):
+        self._model_name = model_name
+        self.tokens = tokens
+        self.updated_at = updated_at
+        self.lock = lock
+        self.rpm = rpm
+
+    def generate_content(self, prompt, **kwargs):
+        with self.lock:
+            now = time.time()
+            burst = max(1, self.rpm // 60)
+            self.tokens.value = min(burst, self.tokens.value + (now - self.updated_at.value) * self.rpm / 60)
+            self.updated_at.value = now
+            if self.tokens.value < 1:
+                raise StubRateLimitError(self._model_name)
+            self.tokens.value -= 1
+        time.sleep(0.02)
+        return StubResponse("ok")
+
+
+def worker(args, shared, results):
+    tokens, updated_at, lock = shared
+    model = QuotaStubModel(tokens, updated_at, lock, args.quota_rpm)
+    quota = SharedQuota(
+        args.db, rpm=args.limit_rpm, burst=max(1, args.limit_rpm // 60), client_rpm=args.client_rpm or None
+    ) if args.db else None
+    router = ModelRouter([model], default_hedge_delay=60, limiter=quota, max_quota_wait=2.0)
+    counts = Counter()
+    counts_lock = threading.Lock()
+    deadline = time.time() + args.seconds
+    rng = random.Random(os.getpid())
+
+    def run():
+        backoff = 0.5
+        while time.time() < deadline:
+            client = 'heavy' if rng.random() < args.heavy_share else f"light-{rng.randrange(LIGHT_CLIENTS)}"
+            try:
+                if quota is not None:
+                    quota.admit_client(client)
+                router.generate_content('prompt')
+            except QuotaExceeded as e:
+                with counts_lock:
+                    counts[f"{e.scope}_throttled"] += 1
+                # The throttled client retries later; the thread moves on to the next request
+                time.sleep(0.05 if e.scope == 'client' else min(e.retry_after, 1.0))
+                continue
+            except StubRateLimitError:
+                with counts_lock:
+                    counts['upstream_429'] += 1
+                time.sleep(backoff + rng.uniform(0, backoff))
+                backoff = min(backoff * 2, 8.0)
+                continue
+            backoff = 0.5
+            with counts_lock:
+                counts['served'] += 1
+                counts[f"served:{'heavy' if client == 'heavy' else 'light'}"] += 1
+
+    threads = [threading.Thread(target=run) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put(dict(counts))
+
+
+def run(args, limited):
+    shared = (multiprocessing.Value('d', max(1, args.quota_rpm // 60)), multiprocessing.Value('d', time.time()),
+              multiprocessing.Lock())
+    results = multiprocessing.Queue()
+    args.db = os.path.join(tempfile.mkdtemp(), 'quota.db') if limited else None
+    processes = [multiprocessing.Process(target=worker, args=(args, shared, results)) for _ in range(args.workers)]
+    for process in processes:
+        process.start()
+    total = Counter()
+    for _ in processes:
+        total.update(results.get())
+    for process in processes:
+        process.join()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--quota-rpm', type=int, default=600, help="the stub Gemini's real quota")
+    parser.add_argument('--limit-rpm', type=int, default=None, help='GEMINI_RPM for the limiter (default: 95%% of the quota)')
+    parser.add_argument('--client-rpm', type=int, default=0, help='GEMINI_CLIENT_RPM (default: a quarter)')
+    parser.add_argument('--heavy-share', type=float, default=0.7)
+    args = parser.parse_args()
+    args.limit_rpm = args.limit_rpm or int(args.quota_rpm * 0.95)
+
+    print(f"{args.workers} workers x {args.threads} threads for {args.seconds:.0f}s, "
+          f"quota {args.quota_rpm} rpm, heavy client sends {args.heavy_share:.0%} of requests")
+    print(f"{'':<12}{'served/min':>11}{'of quota':>10}{'upstream 429':>14}{'heavy share':>13}"
+          f"{'client 429':>12}{'budget waits':>14}")
+    for limited in (False, True):
+        total = run(args, limited)
+        per_minute = total['served'] * 60 / args.seconds
+        heavy = total['served:heavy'] / total['served'] if total['served'] else 0.0
+        print(f"{'limited' if limited else 'unlimited':<12}{per_minute:>11.0f}{per_minute / args.quota_rpm:>10.0%}"
+              f"{total['upstream_429']:>14}{heavy:>13.0%}{total['client_throttled']:>12}"
+              f"{total['deployment_throttled']:>14}")
+
+
+if __name__ == '__main__':
+    main()
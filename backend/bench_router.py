@@ -0,0 +1,56 @@
+"""Benchmark: hedged ModelRouter vs a single model with a slow tail, using stub models.
+
+Usage: python bench_router.py [requests] [concurrency]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from model_router import ModelRouter
+from stub_models import StubModel
+
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+def run(model, requests, concurrency):
+    def call(i):
+        start = time.perf_counter()
+        model.generate_content(f"question {i}")
+        return time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(call, range(requests)))
+
+
+def stub(name, seed):
+    # 3% of calls hit a 1.5s tail on top of ~100ms normal latency
+    return StubModel(name, latency=0.1, jitter=0.03, slow_ratio=0.03, slow_latency=1.5, seed=seed)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    setups = [
+        ('single model', stub('models/primary', 1)),
+        ('router, hedged', ModelRouter(
+            [stub('models/primary', 1), stub('models/secondary', 2)],
+            default_hedge_delay=0.3, min_samples=20
+        )),
+    ]
+    print(f"{'setup':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for label, model in setups:
+        latencies = run(model, requests, concurrency)
+        print(f"{label:<16}" + ''.join(
+            f"{percentile(latencies, q) * 1000:>10.0f}" for q in (0.5, 0.95, 0.99)
+        ))
+        if isinstance(model, ModelRouter):
+            for name, stats in model.snapshot().items():
+                print(f"  {name}: hedges={stats['hedges']} hedge_wins={stats['hedge_wins']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""Micro-benchmark: single-pass ScamDetector vs the old per-pattern re.search loop.
+
+Usage: python bench_scam.py [repeats]
+"""
+import re
+import sys
+import time
+
+from scam_detector import ScamDetector
+
+# The patterns detect_scam_patterns used to loop over
+LEGACY_SCAM_PATTERNS = [
+    r'(?i)(send money|transfer.*urgently|lottery.*won|prince.*nigeria|inheritance.*claim)',
+    r'(?i)(click.*link|verify.*account.*immediately|suspended.*account)',
+    r'(?i)(give.*otp|share.*pin|tell.*password|bank.*details)',
+    r'(?i)(investment.*guaranteed|double.*money|risk.*free.*profit)',
+    r'(?i)(crypto.*mining|bitcoin.*investment|forex.*trading.*sure)'
+]
+
+
+def legacy_detect(message):
+    for pattern in LEGACY_SCAM_PATTERNS:
+        if re.search(pattern, message):
+            return True
+    return False
+
+
+SMS = (
+    "Dear customer, your KYC for the bank account is pending. Visit your branch with "
+    "Aadhaar and PAN. Interest of 7% will be credited to your savings account this month. "
+)
+# Pasted forwards repeat trigger words without completing a rule, which is
+# what makes the '.*' patterns backtrack.
+ADVERSARIAL = "transfer click give share tell bank verify investment double risk crypto bitcoin forex "
+
+INPUTS = [
+    ('short question', "How do I open a bank account for my mother?"),
+    ('sms 2 KB', (SMS * 12)[:2000]),
+    ('sms 20 KB', (SMS * 120)[:20000]),
+    ('adversarial 2 KB', (ADVERSARIAL * 25)[:2000]),
+    ('adversarial 20 KB', (ADVERSARIAL * 250)[:20000]),
+    ('hindi sms 5 KB', ("प्रिय ग्राहक, आपके बचत खाते में ब्याज जमा किया गया है। " * 100)[:5000]),
+]
+
+
+def best_time(fn, text, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(text)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    detector = ScamDetector()
+    print(f"{'input':<20}{'legacy ms':>12}{'detector ms':>14}{'speedup':>10}")
+    for name, text in INPUTS:
+        legacy = best_time(legacy_detect, text, repeats)
+        single_pass = best_time(detector.detect, text, repeats)
+        print(f"{name:<20}{legacy * 1000:>12.3f}{single_pass * 1000:>14.3f}{legacy / single_pass:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
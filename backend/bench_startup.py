@@ -0,0 +1,123 @@
+"""Benchmark: cold start, from interpreter start to the first responses.
+
+Each run starts a fresh Python process that imports app.py and serves
+GET /api/py/health (liveness, first response), then GET /api/py/ready
+(builds the Gemini and SerpAPI clients) through the Flask test client.
+"eager" does the client work before the first response, the way app.py
+used to at import time. No request leaves the machine: building the
+clients does not call the APIs.
+
+With --gunicorn the same is measured over HTTP against gunicorn workers,
+with and without --preload (as in the Procfile).
+
+Usage: python bench_startup.py [--runs 5] [--gunicorn] [--workers 2]
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CHILD = '''
+import json, time
+start = time.perf_counter()
+import app as finstra
+imported = time.perf_counter()
+if {eager}:
+    finstra.preload_client_libraries()
+    finstra.readiness()
+client = finstra.create_app().test_client()
+assert client.get('/api/py/health').status_code == 200
+first_response = time.perf_counter()
+ready_status = client.get('/api/py/ready').status_code
+ready = time.perf_counter()
+print(json.dumps({{'import': imported - start, 'first_response': first_response - start,
+                  'ready': ready - start, 'ready_status': ready_status}}))
+'''
+
+
+def child_env():
+    env = dict(os.environ, LOG_LEVEL='ERROR', LOG_SAMPLE_RATE='0', PYTHONWARNINGS='ignore')
+    env.setdefault('GEMINI_API_KEY', 'bench-startup-key')
+    return env
+
+
+def run_child(eager):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(eager=eager)],
+        cwd=BACKEND_DIR, env=child_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(url, deadline):
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=5) as response:
+                return response.status
+        except urllib.error.HTTPError as e:
+            return e.code
+        except OSError:
+            time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def run_gunicorn(preload, workers):
+    port = free_port()
+    command = ['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}']
+    command += ['--preload', 'app:create_app(preload_libraries=True)'] if preload else ['app:create_app()']
+    start = time.perf_counter()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=child_env(),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        base = f'http://127.0.0.1:{port}/api/py'
+        wait_for(f'{base}/health', start + 60)
+        first_response = time.perf_counter()
+        ready_status = wait_for(f'{base}/ready', start + 60)
+        return {'first_response': first_response - start, 'ready': time.perf_counter() - start,
+                'ready_status': ready_status}
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def report(label, runs):
+    cells = []
+    for key in ('import', 'first_response', 'ready'):
+        if key in runs[0]:
+            cells.append(f"{key} {statistics.median(r[key] for r in runs) * 1000:7.0f} ms")
+    statuses = sorted({r['ready_status'] for r in runs})
+    print(f"{label:<26}" + '   '.join(cells) + f"   /ready -> {statuses}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--gunicorn', action='store_true', help='also measure gunicorn workers over HTTP')
+    parser.add_argument('--workers', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f"Median of {args.runs} cold starts, from interpreter start")
+    report('lazy clients', [run_child(eager=False) for _ in range(args.runs)])
+    report('eager clients', [run_child(eager=True) for _ in range(args.runs)])
+    if args.gunicorn:
+        for preload in (False, True):
+            label = f"gunicorn -w {args.workers}" + (' --preload' if preload else '')
+            report(label, [run_gunicorn(preload, args.workers) for _ in range(args.runs)])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark: voice search latency when SerpAPI or Gemini misbehaves.
+
+Sends real-time questions (distinct, so nothing is cached) to
+/api/py/search through the Flask test client, --concurrency at a time,
+with Gemini replaced by StubModel behind a ModelRouter and SerpAPI by
+StubSerpAPI. Each scenario runs twice:
+
+  unbounded   no request deadline and breakers that never open: the
+              lookup waits SERPAPI_TIMEOUT, Gemini as long as it takes
+  bounded     VOICE_SEARCH_DEADLINE split between the lookup and Gemini,
+              and circuit breakers on both
+
+Times are scaled down (SERPAPI_TIMEOUT 1s, deadline 3s, 1.5s reserved for
+Gemini) so a run takes seconds. "errors" counts error bodies (Gemini
+timed out or its breaker was open), "no web result" answers generated
+without the SerpAPI snippet.
+
+Usage: python bench_voice_search.py [--requests 200] [--concurrency 8]
+"""
+import argparse
+import os
+import re
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = {
+    'healthy': dict(serp_latency=0.3, serp_errors=0.0, slow_ratio=0.0),
+    'serpapi slow': dict(serp_latency=3.0, serp_errors=0.0, slow_ratio=0.0),
+    'serpapi down': dict(serp_latency=0.5, serp_errors=1.0, slow_ratio=0.0),
+    'gemini tail': dict(serp_latency=0.3, serp_errors=0.0, slow_ratio=0.1),
+}
+
+
+def recording_model(**kwargs):
+    """StubModel that remembers which questions were asked with a web result in the prompt"""
+    from stub_models import StubModel
+
+    class RecordingModel(StubModel):
+        def generate_content(self, prompt, stream=False, **options):
+            if 'Stub result' in prompt:
+                self.with_web.add(re.search(r'market (\d+)', prompt).group(1))
+            return super().generate_content(prompt, stream=stream, **options)
+
+    model = RecordingModel(**kwargs)
+    model.with_web = set()
+    return model
+
+
+def configure(finstra, bounded, scenario, seed):
+    from circuit_breaker import CircuitBreaker
+    from model_router import ModelRouter
+    from stub_models import StubSerpAPI
+
+    finstra.SERPAPI_TIMEOUT = 1.0
+    finstra.LLM_MIN_BUDGET = 1.5
+    finstra.VOICE_SEARCH_DEADLINE = 3.0 if bounded else 3600.0
+    threshold = 5 if bounded else 10 ** 9
+    finstra.gemini_breaker = CircuitBreaker('Gemini', threshold, reset_timeout=5.0)
+    finstra.serpapi_breaker = CircuitBreaker('SerpAPI', threshold, reset_timeout=5.0)
+    finstra.search_cache.clear()
+    finstra.model = ModelRouter([recording_model(
+        latency=0.4, jitter=0.1, slow_ratio=scenario['slow_ratio'], slow_latency=8.0, seed=seed
+    )], default_hedge_delay=60)
+    finstra.serpapi_client = StubSerpAPI(
+        latency=scenario['serp_latency'], jitter=0.1, error_ratio=scenario['serp_errors'], seed=seed
+    )
+
+
+def run(finstra, requests, concurrency, first):
+    """Send questions first..first+requests; lookups left over from an earlier run cannot answer them"""
+    client = finstra.app.test_client()
+
+    def one(i):
+        start = time.perf_counter()
+        body = client.post('/api/py/search', json={'text': f"gold price today in market {i}"}).get_json()
+        return time.perf_counter() - start, body['status'] != 'success'
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(one, range(first, first + requests)))
+    latencies = sorted(r[0] for r in results)
+    without_web = requests - len(finstra.model.models[0].with_web)
+    return {
+        'p50': statistics.median(latencies),
+        'p99': latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))],
+        'max': latencies[-1],
+        'errors': sum(r[1] for r in results) / len(results),
+        'without_web': without_web / len(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault('GEMINI_API_KEY', 'bench-voice-search-key')
+    os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+    os.environ.setdefault('LOG_SAMPLE_RATE', '0')
+    import app as finstra
+
+    print(f"{args.requests} requests, {args.concurrency} at a time")
+    print(f"{'':<14}{'':<11}{'p50':>8}{'p99':>8}{'max':>8}{'errors':>8}{'no web result':>15}")
+    first = 0
+    for name, scenario in SCENARIOS.items():
+        for bounded in (False, True):
+            configure(finstra, bounded, scenario, args.seed)
+            result = run(finstra, args.requests, args.concurrency, first)
+            first += args.requests
+            print(f"{name:<14}{'bounded' if bounded else 'unbounded':<11}{result['p50']:>7.2f}s"
+                  f"{result['p99']:>7.2f}s{result['max']:>7.2f}s{result['errors']:>8.0%}{result['without_web']:>15.0%}")
+
+
+if __name__ == '__main__':
+    main()
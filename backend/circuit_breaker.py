@@ -0,0 +1,94 @@
+import threading
+import time
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open"""
+
+    def __init__(self, name, retry_after):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"{name} is temporarily unavailable, retry in {max(1, round(retry_after))}s")
+
+
+class CircuitBreaker:
+    """Fails fast while an upstream is unhealthy.
+
+    After failure_threshold consecutive failures the breaker opens and
+    calls are refused for reset_timeout seconds. Then one trial call is let
+    through (half-open): success closes the breaker, failure opens it
+    again. State is per process.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self.rejected = 0
+        self._trial_started_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go ahead now; an allowed half-open call is the trial"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            now = time.monotonic()
+            if self.state == 'open' and now - self.opened_at >= self.reset_timeout:
+                self.state = 'half_open'
+                self._trial_started_at = None
+            # A trial that never reported back (e.g. abandoned on a timeout)
+            # is replaced after another reset_timeout
+            if self.state == 'half_open' and (
+                    self._trial_started_at is None or now - self._trial_started_at >= self.reset_timeout):
+                self._trial_started_at = now
+                return True
+            self.rejected += 1
+            return False
+
+    @property
+    def is_open(self):
+        """Open and still refusing calls (no trial due yet), without taking the trial"""
+        with self._lock:
+            return self.state == 'open' and time.monotonic() - self.opened_at < self.reset_timeout
+
+    def check(self):
+        """allow(), raising CircuitOpenError when the call is refused"""
+        if not self.allow():
+            raise CircuitOpenError(self.name, self.retry_after())
+
+    def retry_after(self):
+        """Seconds until the next trial call may be let through"""
+        with self._lock:
+            if self.state != 'open':
+                return 1.0
+            return max(1.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_started_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                if self.state != 'open':
+                    self.opens += 1
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+                self._trial_started_at = None
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'opens': self.opens,
+                'rejected': self.rejected
+            }
@@ -0,0 +1,120 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+
+
+def estimate_tokens(text):
+    """Cheap token estimate without a tokenizer.
+
+    Latin text averages about 4 characters per token; Devanagari and
+    Bengali split into far more tokens per character, so non-ASCII
+    characters are counted at about 2 per token.
+    """
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars) // 2 + 1
+
+
+def _first_sentence(text, max_chars=160):
+    text = re.sub(r'\s+', ' ', text).strip()
+    match = re.match(r'(.+?[.?!।])(\s|$)', text)
+    sentence = match.group(1) if match else text
+    if len(sentence) > max_chars:
+        sentence = sentence[:max_chars].rstrip() + '…'
+    return sentence
+
+
+def _turn_line(msg):
+    role = "User" if msg.get('sender') == 'user' else "Assistant"
+    return f"{role}: {msg.get('message', '')}\n"
+
+
+class ContextBuilder:
+    """Build the conversation context for a prompt within a token budget.
+
+    The newest turns are packed verbatim until the budget is used up. The
+    older turns that did not fit are compressed into a rolling summary:
+    one short line per turn (the first sentence of each message), capped
+    at summary_tokens. Summaries are cached by a hash chain over the turns,
+    so when the conversation grows by one turn only that turn is summarized
+    and earlier work is reused instead of redone on every request.
+    """
+
+    def __init__(self, token_budget=800, summary_tokens=200, cache_size=1024):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.cache_size = cache_size
+        self._summaries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def build(self, chat_history):
+        """Return the 'Role: message' context string for the prompt"""
+        if not chat_history:
+            return ""
+
+        lines = []
+        used = 0
+        recent_budget = self.token_budget - self.summary_tokens
+        cut = len(chat_history)
+        for msg in reversed(chat_history):
+            line = _turn_line(msg)
+            cost = estimate_tokens(line)
+            if used + cost > recent_budget:
+                if not lines:
+                    # A single oversized newest turn is trimmed, not dropped
+                    line = self._truncate(line, recent_budget)
+                    lines.append(line)
+                    cut -= 1
+                break
+            lines.append(line)
+            used += cost
+            cut -= 1
+
+        context = ''.join(reversed(lines))
+        if cut > 0:
+            summary = self._summary(chat_history[:cut])
+            context = f"Summary of earlier conversation:\n{summary}\n\n" + context
+        return context
+
+    @staticmethod
+    def _truncate(line, budget):
+        chars = max(40, budget * 2)
+        return line[:chars].rstrip() + '…\n' if len(line) > chars else line
+
+    def _summary(self, turns):
+        # Hash chain over the turns: prefix_keys[i] identifies turns[:i + 1]
+        prefix_keys = []
+        digest = hashlib.sha256()
+        for msg in turns:
+            digest.update(_turn_line(msg).encode('utf-8'))
+            prefix_keys.append(digest.copy().hexdigest())
+
+        with self._lock:
+            start, bullets = 0, []
+            for i in range(len(turns) - 1, -1, -1):
+                cached = self._summaries.get(prefix_keys[i])
+                if cached is not None:
+                    self._summaries.move_to_end(prefix_keys[i])
+                    start, bullets = i + 1, cached
+                    break
+
+        for i in range(start, len(turns)):
+            msg = turns[i]
+            role = "User" if msg.get('sender') == 'user' else "Assistant"
+            bullets = self._fit(bullets + [f"- {role}: {_first_sentence(msg.get('message', ''))}"])
+            self._remember(prefix_keys[i], bullets)
+
+        return '\n'.join(bullets)
+
+    def _fit(self, bullets):
+        # Drop the oldest lines first once the summary exceeds its budget
+        while len(bullets) > 1 and sum(estimate_tokens(b) for b in bullets) > self.summary_tokens:
+            bullets = bullets[1:]
+        return bullets
+
+    def _remember(self, key, bullets):
+        with self._lock:
+            self._summaries[key] = bullets
+            self._summaries.move_to_end(key)
+            while len(self._summaries) > self.cache_size:
+                self._summaries.popitem(last=False)
@@ -0,0 +1,23 @@
+import time
+
+
+class Deadline:
+    """Time budget for one request, shared out across its stages"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def budget(self, cap=None, reserve=0.0):
+        """Seconds a stage may use: at most cap, leaving reserve for the stages after it"""
+        budget = self.remaining() - reserve
+        if cap is not None:
+            budget = min(cap, budget)
+        return max(0.0, budget)
+
+    @property
+    def expired(self):
+        return self.remaining() <= 0
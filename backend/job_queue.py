@@ -0,0 +1,273 @@
+import heapq
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from structured_log import log_event
+
+
+def is_rate_limit_error(error):
+    """Gemini surfaces quota errors as exceptions whose message carries the 429 code"""
+    return '429' in str(error)
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when max_jobs generations are already waiting in this process.
+
+    The message carries 429 so callers answer it like the rate limit that
+    sent the generation to the queue.
+    """
+
+    def __init__(self, max_jobs):
+        super().__init__(f"429 Too many queued generations ({max_jobs}), please try again later")
+
+
+class MemoryJobStore:
+    """Job state in this process only. Suitable for a single worker"""
+
+    def __init__(self):
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def save(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def purge(self, before):
+        """Forget jobs last updated before the given time.time()"""
+        with self._lock:
+            for job_id in [j for j, job in self._jobs.items() if job['updated_at'] < before]:
+                del self._jobs[job_id]
+
+    def counts(self):
+        with self._lock:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job['status']] += 1
+            return counts
+
+
+class SQLiteJobStore:
+    """Job state in a local SQLite file shared by all worker processes.
+
+    A job runs in the worker that queued it, but any worker can answer a
+    poll for it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id TEXT PRIMARY KEY, status TEXT NOT NULL, job TEXT NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS jobs_updated_at ON jobs (updated_at)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def save(self, job):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO jobs (id, status, job, updated_at) VALUES (?, ?, ?, ?)',
+                (job['id'], job['status'], json.dumps(job, ensure_ascii=False), job['updated_at'])
+            )
+
+    def get(self, job_id):
+        row = self._connection().execute('SELECT job FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def purge(self, before):
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM jobs WHERE updated_at < ?', (before,))
+
+    def counts(self):
+        counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+        for status, count in self._connection().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'):
+            counts[status] = count
+        return counts
+
+
+def create_job_store():
+    """Pick the job state backend from JOB_STORE ('memory' or 'sqlite')"""
+    if os.getenv('JOB_STORE', 'memory').lower() == 'sqlite':
+        return SQLiteJobStore(os.getenv('JOB_DB_PATH', 'jobs.db'))
+    return MemoryJobStore()
+
+
+class GenerationJobQueue:
+    """Background queue for generations that hit the Gemini rate limit.
+
+    Jobs are retried with exponential backoff and jitter on worker threads,
+    so HTTP workers never sleep. A job runs in the process that queued it
+    (its callbacks live there); its state is kept in store, which callers
+    poll by job id through get(). At most max_jobs jobs wait or run in
+    one process; submit() raises JobQueueFull beyond that. Finished jobs
+    are kept for result_ttl seconds.
+    """
+
+    def __init__(self, generate, workers=2, max_attempts=5, base_delay=5.0,
+                 max_delay=120.0, result_ttl=600, max_jobs=1000, store=None):
+        self.generate = generate
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.result_ttl = result_ttl
+        self.max_jobs = max_jobs
+        self.store = store or MemoryJobStore()
+        self.rejected = 0
+        self._last_purge = 0.0
+        # Unfinished jobs of this process, with their prompt and callback
+        self._jobs = {}
+        self._schedule = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+
+    def _ensure_workers(self):
+        # Threads are started lazily so each gunicorn worker process gets its own
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"generation-job-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def backoff_delay(self, attempt):
+        """Exponential backoff with equal jitter for the given (1-based) attempt"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def submit(self, prompt, on_success=None, payload=None, attempts=1):
+        """Queue a generation and return its job id.
+
+        attempts is the number of tries already made by the caller, which
+        sets the first backoff delay. on_success(text) turns the raw model
+        text into the stored result; payload is merged into the result.
+        """
+        job_id = uuid.uuid4().hex
+        ready_at = time.time() + self.backoff_delay(attempts)
+        state = {
+            'id': job_id,
+            'payload': payload or {},
+            'status': 'queued',
+            'attempts': attempts,
+            'ready_at': ready_at,
+            'result': None,
+            'error': None,
+            'updated_at': time.time()
+        }
+        with self._cond:
+            if len(self._jobs) >= self.max_jobs:
+                self.rejected += 1
+                raise JobQueueFull(self.max_jobs)
+            self._jobs[job_id] = {'state': state, 'prompt': prompt, 'on_success': on_success}
+        self.store.save(state)
+        self._purge()
+        with self._cond:
+            heapq.heappush(self._schedule, (ready_at, next(self._seq), job_id))
+            self._ensure_workers()
+            self._cond.notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return a snapshot of the job state, or None if unknown or expired"""
+        job = self.store.get(job_id)
+        if job is None or time.time() - job['updated_at'] > self.result_ttl:
+            return None
+        snapshot = {
+            'id': job['id'],
+            'status': job['status'],
+            'attempts': job['attempts'],
+            'result': job['result'],
+            'error': job['error'],
+            'payload': job['payload']
+        }
+        if job['status'] == 'queued':
+            snapshot['retry_after'] = max(1, math.ceil(job['ready_at'] - time.time()))
+        return snapshot
+
+    def stats(self):
+        """Job counts by status (across workers with a shared store) and this process's queue"""
+        with self._cond:
+            local = len(self._jobs)
+        return dict(self.store.counts(), local_jobs=local, max_jobs=self.max_jobs, rejected=self.rejected)
+
+    def _purge(self):
+        # Finished jobs (and those of a worker that went away) are swept at most once a minute
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self.store.purge(now - self.result_ttl)
+
+    def _update(self, job, **changes):
+        job['state'].update(changes, updated_at=time.time())
+        self.store.save(job['state'])
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    now = time.time()
+                    if self._schedule and self._schedule[0][0] <= now:
+                        _, _, job_id = heapq.heappop(self._schedule)
+                        break
+                    timeout = self._schedule[0][0] - now if self._schedule else None
+                    self._cond.wait(timeout)
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+            self._update(job, status='running')
+            self._attempt(job)
+
+    def _attempt(self, job):
+        try:
+            text = self.generate(job['prompt'])
+            result = job['on_success'](text) if job['on_success'] else text
+        except Exception as e:
+            state = job['state']
+            log_event(
+                'generation_job_attempt_failed', level=logging.WARNING,
+                job_id=state['id'], attempt=state['attempts'], error=str(e)
+            )
+            if is_rate_limit_error(e) and state['attempts'] < self.max_attempts:
+                attempts = state['attempts'] + 1
+                ready_at = time.time() + self.backoff_delay(attempts)
+                self._update(job, status='queued', attempts=attempts, ready_at=ready_at)
+                with self._cond:
+                    heapq.heappush(self._schedule, (ready_at, next(self._seq), state['id']))
+                    self._cond.notify()
+            else:
+                self._finish(job, status='failed', error=str(e))
+            return
+
+        self._finish(job, status='done', result=result)
+
+    def _finish(self, job, **changes):
+        self._update(job, **changes)
+        with self._cond:
+            self._jobs.pop(job['state']['id'], None)
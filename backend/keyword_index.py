@@ -0,0 +1,38 @@
+from phrase_matcher import PhraseMatcher
+
+
+class KeywordIndex:
+    """Word-boundary-aware keyword index over several categories.
+
+    All keywords of all categories and languages share one PhraseMatcher,
+    so a message is scanned once and every category is scored in that pass
+    (the number of keyword hits), instead of first-match-wins substring
+    checks. Keywords follow PhraseMatcher syntax ('loan*' takes suffixes).
+    """
+
+    def __init__(self, keywords):
+        # Category order doubles as the tie-breaker in best()
+        self.categories = list(keywords)
+        phrases = []
+        self._phrase_category = []
+        for category, words in keywords.items():
+            for word in words:
+                phrases.append(word)
+                self._phrase_category.append(category)
+        self._matcher = PhraseMatcher(phrases)
+
+    def scores(self, text):
+        """Return {category: hit count} for every category with at least one hit"""
+        scores = {}
+        for phrase_id, _, _ in self._matcher.find_all(text):
+            category = self._phrase_category[phrase_id]
+            scores[category] = scores.get(category, 0) + 1
+        return scores
+
+    def best(self, scores, candidates=None):
+        """Highest-scoring category among candidates (default: all), or None"""
+        best_category = None
+        for category in candidates or self.categories:
+            if scores.get(category, 0) > scores.get(best_category, 0):
+                best_category = category
+        return best_category
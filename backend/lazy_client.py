@@ -0,0 +1,61 @@
+import os
+import threading
+import time
+
+
+class LazyClient:
+    """Stand-in for an API client that is built on first use.
+
+    Attribute access is forwarded to the client, so callers use it like the
+    client itself. The client is built once per process: one built before a
+    fork (gunicorn --preload) is rebuilt in the worker instead of sharing
+    its connections. If building fails the error is kept for the readiness
+    check and raised again to the caller; the next use retries.
+    """
+
+    def __init__(self, name, build):
+        self._name = name
+        self._build = build
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.error = None
+        self.build_seconds = None
+
+    def get(self):
+        client = self._client
+        if client is not None and self._pid == os.getpid():
+            return client
+        with self._lock:
+            if self._client is None or self._pid != os.getpid():
+                start = time.perf_counter()
+                try:
+                    self._client = self._build()
+                except Exception as e:
+                    self._client = None
+                    self.error = str(e)
+                    raise
+                self._pid = os.getpid()
+                self.error = None
+                self.build_seconds = time.perf_counter() - start
+            return self._client
+
+    @property
+    def loaded(self):
+        return self._client is not None and self._pid == os.getpid()
+
+    def status(self):
+        return {
+            'loaded': self.loaded,
+            'build_seconds': round(self.build_seconds, 3) if self.build_seconds is not None else None,
+            'error': self.error
+        }
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found on the proxy itself
+        if attr.startswith('__'):
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __repr__(self):
+        return f"<LazyClient {self._name} loaded={self.loaded}>"
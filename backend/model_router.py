@@ -0,0 +1,313 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from quota_limiter import QuotaExceeded
+
+
+class ModelStats:
+    """Rolling latency and error window for one model"""
+
+    def __init__(self, window=100):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)  # True for errors
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._lock = threading.Lock()
+
+    def record(self, latency, error=None):
+        with self._lock:
+            self.requests += 1
+            self.outcomes.append(error is not None)
+            if error is None:
+                self.latencies.append(latency)
+            else:
+                self.errors += 1
+                if '429' in str(error):
+                    self.rate_limited += 1
+
+    def percentile(self, q):
+        with self._lock:
+            samples = sorted(self.latencies)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def error_rate(self):
+        with self._lock:
+            return sum(self.outcomes) / len(self.outcomes) if self.outcomes else 0.0
+
+    def snapshot(self):
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'rate_limited': self.rate_limited,
+            'error_rate': round(self.error_rate(), 4),
+            'p50_seconds': round(p50, 4) if p50 is not None else None,
+            'p95_seconds': round(p95, 4) if p95 is not None else None,
+            'hedges': self.hedges,
+            'hedge_wins': self.hedge_wins,
+            'failovers': self.failovers
+        }
+
+
+class ModelRouter:
+    """Latency-aware router over several Gemini models with hedged requests.
+
+    Holds one client per configured model, in preference order. Each call
+    goes to the first healthy model; if it has not answered within the
+    hedge delay (its rolling p95 latency, or default_hedge_delay until
+    min_samples calls have been seen) the same prompt is sent to the next
+    healthy model and whichever succeeds first wins. A model whose call
+    fails (e.g. a 429) fails over to the next one right away. Models whose
+    recent error rate exceeds max_error_rate are skipped while any other
+    model is healthy.
+
+    It exposes generate_content/generate_content_async like a single
+    GenerativeModel, so callers do not need to know it is there. Any object
+    with those methods and a _model_name works as a model, including the
+    local stubs in stub_models.py.
+
+    With a limiter (quota_limiter.SharedQuota) every call, hedges and
+    failovers included, first reserves a request from that model's budget;
+    models without one are skipped. If no model has budget the call waits
+    up to max_quota_wait for one, then raises QuotaExceeded. 429s are
+    reported back to the limiter.
+
+    timeout bounds the whole call, hedges included: past it TimeoutError
+    is raised and the calls still running are abandoned. It is handled
+    here and not passed on to the models.
+    """
+
+    def __init__(self, models, default_hedge_delay=2.0, min_samples=20,
+                 max_error_rate=0.5, window=100, max_workers=32, limiter=None, max_quota_wait=2.0):
+        if not models:
+            raise ValueError("ModelRouter needs at least one model")
+        self.models = list(models)
+        self.default_hedge_delay = default_hedge_delay
+        self.min_samples = min_samples
+        self.max_error_rate = max_error_rate
+        self.stats = {m._model_name: ModelStats(window) for m in self.models}
+        self.limiter = limiter
+        self.max_quota_wait = max_quota_wait
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='model-router')
+
+    @property
+    def _model_name(self):
+        return self._ranked()[0]._model_name
+
+    def _ranked(self):
+        """Models in preference order, unhealthy ones moved to the back"""
+        healthy = [m for m in self.models if self.stats[m._model_name].error_rate() <= self.max_error_rate]
+        return healthy + [m for m in self.models if m not in healthy]
+
+    def hedge_delay(self, model):
+        stats = self.stats[model._model_name]
+        if len(stats.latencies) < self.min_samples:
+            return self.default_hedge_delay
+        return stats.percentile(0.95)
+
+    def _pick(self, candidates):
+        """First remaining candidate with budget left, as (model, 0), or (None, shortest wait)"""
+        shortest = None
+        for model in candidates:
+            wait = self.limiter.acquire(model._model_name) if self.limiter else 0.0
+            if not wait:
+                return model, 0.0
+            shortest = wait if shortest is None else min(shortest, wait)
+        return None, shortest
+
+    def _first(self, ranked, budget=None):
+        """The model for a new call, waiting up to max_quota_wait (and the call's budget) for quota"""
+        deadline = time.monotonic() + min(self.max_quota_wait, budget if budget is not None else self.max_quota_wait)
+        while True:
+            model, wait = self._pick(ranked)
+            if model is not None:
+                return model
+            if time.monotonic() + wait > deadline:
+                raise QuotaExceeded('deployment', wait)
+            time.sleep(wait)
+
+    async def _pick_async(self, candidates):
+        # The limiter's SQLite transaction can wait on other workers' locks: keep it off the event loop
+        if self.limiter is None:
+            return self._pick(candidates)
+        return await asyncio.to_thread(self._pick, candidates)
+
+    async def _first_async(self, ranked, budget=None):
+        deadline = time.monotonic() + min(self.max_quota_wait, budget if budget is not None else self.max_quota_wait)
+        while True:
+            model, wait = await self._pick_async(ranked)
+            if model is not None:
+                return model
+            if time.monotonic() + wait > deadline:
+                raise QuotaExceeded('deployment', wait)
+            await asyncio.sleep(wait)
+
+    def _report_rate_limit(self, model, error):
+        if self.limiter and '429' in str(error) and not isinstance(error, QuotaExceeded):
+            self.limiter.report_rate_limited(model._model_name)
+
+    async def _report_rate_limit_async(self, model, error):
+        if self.limiter:
+            await asyncio.to_thread(self._report_rate_limit, model, error)
+
+    def _record_error(self, model, latency, error):
+        self.stats[model._model_name].record(latency, error)
+        self._report_rate_limit(model, error)
+
+    def _timed_call(self, model, prompt, **kwargs):
+        start = time.monotonic()
+        try:
+            response = model.generate_content(prompt, **kwargs)
+        except Exception as e:
+            self._record_error(model, time.monotonic() - start, e)
+            raise
+        self.stats[model._model_name].record(time.monotonic() - start)
+        return response
+
+    def _wait_timeout(self, hedge_at, deadline):
+        """Seconds until the next hedge or the deadline, or None; raises TimeoutError once the deadline passed"""
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            raise TimeoutError("Gemini did not answer within the request's time budget")
+        wake = [t for t in (hedge_at, deadline) if t is not None]
+        return min(wake) - now if wake else None
+
+    def generate_content(self, prompt, stream=False, timeout=None, **kwargs):
+        ranked = self._ranked()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        first = self._first(ranked, timeout)
+        if stream:
+            # Streams are not hedged (the first chunk commits to a model) and
+            # not timed, since only the time to open the stream is visible here
+            try:
+                return first.generate_content(prompt, stream=True, **kwargs)
+            except Exception as e:
+                self._report_rate_limit(first, e)
+                raise
+
+        pending = {}
+        candidates = iter(ranked[ranked.index(first) + 1:])
+        last_error = None
+
+        def launch(reason=None):
+            model = first if reason is None else self._pick(candidates)[0]
+            if model is None:
+                return
+            if reason == 'hedge':
+                self.stats[model._model_name].hedges += 1
+            elif reason == 'failover':
+                self.stats[model._model_name].failovers += 1
+            pending[self._executor.submit(self._timed_call, model, prompt, **kwargs)] = (model, reason)
+
+        launch()
+        hedge_at = time.monotonic() + self.hedge_delay(first)
+        while pending:
+            done, _ = wait(pending, timeout=self._wait_timeout(hedge_at, deadline), return_when=FIRST_COMPLETED)
+            if not done:
+                if hedge_at is not None and time.monotonic() >= hedge_at:
+                    # Primary is slower than its p95: hedge with the next model
+                    launch('hedge')
+                    hedge_at = None
+                continue
+            for future in done:
+                model, reason = pending.pop(future)
+                try:
+                    response = future.result()
+                except Exception as e:
+                    last_error = e
+                    if not pending:
+                        launch('failover')
+                    continue
+                if reason == 'hedge':
+                    self.stats[model._model_name].hedge_wins += 1
+                return response
+        raise last_error
+
+    async def generate_content_async(self, prompt, stream=False, timeout=None, **kwargs):
+        ranked = self._ranked()
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        first = await self._first_async(ranked, timeout)
+
+        async def timed_call(model):
+            start = time.monotonic()
+            try:
+                response = await model.generate_content_async(prompt, **kwargs)
+            except Exception as e:
+                self.stats[model._model_name].record(time.monotonic() - start, e)
+                await self._report_rate_limit_async(model, e)
+                raise
+            self.stats[model._model_name].record(time.monotonic() - start)
+            return response
+
+        if stream:
+            try:
+                return await first.generate_content_async(prompt, stream=True, **kwargs)
+            except Exception as e:
+                await self._report_rate_limit_async(first, e)
+                raise
+
+        pending = {}
+        candidates = iter(ranked[ranked.index(first) + 1:])
+        last_error = None
+
+        async def launch(reason=None):
+            model = first if reason is None else (await self._pick_async(candidates))[0]
+            if model is None:
+                return
+            if reason == 'hedge':
+                self.stats[model._model_name].hedges += 1
+            elif reason == 'failover':
+                self.stats[model._model_name].failovers += 1
+            pending[asyncio.ensure_future(timed_call(model))] = (model, reason)
+
+        await launch()
+        hedge_at = time.monotonic() + self.hedge_delay(first)
+        try:
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=self._wait_timeout(hedge_at, deadline), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    if hedge_at is not None and time.monotonic() >= hedge_at:
+                        await launch('hedge')
+                        hedge_at = None
+                    continue
+                for task in done:
+                    model, reason = pending.pop(task)
+                    try:
+                        response = task.result()
+                    except Exception as e:
+                        last_error = e
+                        if not pending:
+                            await launch('failover')
+                        continue
+                    if reason == 'hedge':
+                        self.stats[model._model_name].hedge_wins += 1
+                    return response
+        finally:
+            # The losing call is not needed any more
+            for task in pending:
+                task.cancel()
+        raise last_error
+
+    def snapshot(self):
+        """Per-model rolling latency/error stats plus the current hedge delays"""
+        snapshot = {}
+        for model in self.models:
+            stats = dict(
+                self.stats[model._model_name].snapshot(),
+                hedge_delay_seconds=round(self.hedge_delay(model), 4)
+            )
+            if self.limiter:
+                stats['quota'] = self.limiter.state(model._model_name)
+            snapshot[model._model_name] = stats
+        return snapshot
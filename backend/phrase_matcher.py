@@ -0,0 +1,98 @@
+import unicodedata
+from collections import deque
+
+
+def is_word_char(ch):
+    """Letters, digits and combining marks (Devanagari/Bengali vowel signs) form words"""
+    return ch.isalnum() or unicodedata.category(ch)[0] == 'M'
+
+
+class PhraseMatcher:
+    """Aho-Corasick automaton over a fixed set of phrases.
+
+    All phrases are found in a single left-to-right pass over the text, so
+    matching is linear in the text length no matter how many phrases are
+    loaded. Matching is case-insensitive and, by default, respects word
+    boundaries: a phrase must start and end on a word edge, except that a
+    phrase ending in '*' may be followed by more word characters
+    ('sav*' matches 'save', 'saving' and 'savings').
+    """
+
+    def __init__(self, phrases, whole_words=True):
+        self.whole_words = whole_words
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        self.phrases = []
+        self._prefix = []
+        for phrase in phrases:
+            self._add(phrase)
+        self._alphabet = set()
+        for edges in self._goto:
+            self._alphabet.update(edges)
+        self._build()
+
+    @staticmethod
+    def normalize(text):
+        return unicodedata.normalize('NFC', text).lower()
+
+    def _add(self, phrase):
+        prefix = phrase.endswith('*')
+        key = self.normalize(phrase.rstrip('*'))
+        if not key:
+            return
+        phrase_id = len(self.phrases)
+        self.phrases.append(phrase)
+        self._prefix.append(prefix)
+        state = 0
+        for ch in key:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((phrase_id, len(key)))
+
+    def _build(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(ch, 0)
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def find_all(self, text):
+        """Return (phrase_id, start, end) for every match, ordered by end position"""
+        text = self.normalize(text)
+        goto, fail, output = self._goto, self._fail, self._output
+        alphabet = self._alphabet
+        matches = []
+        state = 0
+        for i, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if output[state]:
+                for phrase_id, length in output[state]:
+                    start = i - length + 1
+                    if self.whole_words and not self._on_word_edges(text, start, i + 1, phrase_id):
+                        continue
+                    matches.append((phrase_id, start, i + 1))
+        return matches
+
+    def _on_word_edges(self, text, start, end, phrase_id):
+        if start > 0 and is_word_char(text[start - 1]) and is_word_char(text[start]):
+            return False
+        if self._prefix[phrase_id]:
+            return True
+        return not (end < len(text) and is_word_char(text[end]) and is_word_char(text[end - 1]))
@@ -0,0 +1,190 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+
+from transliterate import romanize
+
+
+def _ngrams(romanized, n=3):
+    text = f" {romanized} "
+    return [text[i:i + n] for i in range(len(text) - n + 1)]
+
+
+def char_ngrams(text, n=3):
+    """Character n-grams of the romanized text, with word edges marked by spaces"""
+    return _ngrams(romanize(text), n)
+
+
+def number_tokens(text):
+    """The numbers in text, in any script, with digit grouping dropped ('1,00,000' and '१०००००' both give '100000')"""
+    return sorted(str(int(number)) for number in re.findall(r'\d+', re.sub(r'(?<=\d)[,_](?=\d)', '', text)))
+
+
+class _Scope:
+    """Inverted index over the entries of one scope (language)"""
+
+    def __init__(self):
+        self.postings = {}    # n-gram -> {entry_id: term frequency}
+        self.lengths = {}     # entry_id -> number of n-grams
+        self.entries = 0
+        self.total_length = 0
+
+    def add(self, entry_id, grams):
+        for gram, tf in Counter(grams).items():
+            self.postings.setdefault(gram, {})[entry_id] = tf
+        self.lengths[entry_id] = len(grams)
+        self.entries += 1
+        self.total_length += len(grams)
+
+    def remove(self, entry_id, grams):
+        for gram in set(grams):
+            posting = self.postings.get(gram)
+            if posting is not None:
+                posting.pop(entry_id, None)
+                if not posting:
+                    del self.postings[gram]
+        del self.lengths[entry_id]
+        self.entries -= 1
+        self.total_length -= len(grams)
+
+    def idf(self, gram):
+        return math.log((self.entries + 1) / (len(self.postings.get(gram, ())) + 1)) + 1
+
+
+class QuestionIndex:
+    """Retrieval index of answered questions for serving paraphrases without a model call.
+
+    Questions are indexed by character trigrams of their romanized text
+    (see transliterate.py), so spelling variants, inflections and
+    Hinglish/Banglish typing of the same words overlap across scripts.
+    A lookup ranks candidates with BM25 over the inverted index, then
+    rescores the top few by TF-IDF cosine similarity (0..1), which is what
+    threshold is compared against. Entries are kept per scope (the answer
+    language) and evicted least recently used beyond max_entries.
+
+    Trigrams barely see numbers ("a loan of 5000" and "of 50000" score
+    0.98), so a match also needs exactly the same numbers as the query:
+    an answer about another amount or year is never served.
+
+    BM25 scores the query's rarest n-grams first and stops once
+    max_postings postings have been visited, so lookup cost stays flat as
+    the index grows: the common n-grams left out ("how", " ka") appear in
+    most entries and barely change the ranking.
+    """
+
+    def __init__(self, max_entries=5000, threshold=0.85, candidates=5, max_postings=5000,
+                 k1=1.2, b=0.75):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self.candidates = candidates
+        self.max_postings = max_postings
+        self.k1 = k1
+        self.b = b
+        self._entries = OrderedDict()   # entry_id -> (key, answer, numbers)
+        self._keys = {}                 # (scope, romanized question) -> entry_id
+        self._scopes = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def add(self, scope, question, answer):
+        """Index an answered question, replacing an earlier answer to the same question"""
+        romanized = romanize(question)
+        grams = _ngrams(romanized)
+        if len(grams) < 2:
+            return
+        key = (scope, romanized)
+        with self._lock:
+            if key in self._keys:
+                self._remove(self._keys[key])
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (key, answer, number_tokens(question))
+            self._keys[key] = entry_id
+            self._scopes.setdefault(scope, _Scope()).add(entry_id, grams)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, entry_id):
+        # N-grams are recomputed rather than kept per entry, which would
+        # roughly double the index's memory
+        key = self._entries.pop(entry_id)[0]
+        del self._keys[key]
+        self._scopes[key[0]].remove(entry_id, _ngrams(key[1]))
+
+    def lookup(self, scope, question):
+        """Return (answer, similarity, matched question) for the closest entry, or None below threshold.
+
+        The matched question is given in its romanized form.
+        """
+        query = Counter(char_ngrams(question))
+        numbers = number_tokens(question)
+        with self._lock:
+            index = self._scopes.get(scope)
+            best = None
+            if index and index.entries and query:
+                for entry_id in self._bm25_candidates(index, query):
+                    if self._entries[entry_id][2] != numbers:
+                        continue
+                    candidate = Counter(_ngrams(self._entries[entry_id][0][1]))
+                    similarity = self._cosine(index, query, candidate)
+                    if best is None or similarity > best[1]:
+                        best = (entry_id, similarity)
+            if best is None or best[1] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best[0])
+            key, answer, _ = self._entries[best[0]]
+            return answer, best[1], key[1]
+
+    def _bm25_candidates(self, index, query):
+        n = index.entries
+        lengths = index.lengths
+        c1 = self.k1 * (1 - self.b)
+        c2 = self.k1 * self.b * n / index.total_length
+        terms = sorted(
+            ((len(posting), query_tf, posting)
+             for posting, query_tf in ((index.postings.get(gram), tf) for gram, tf in query.items())
+             if posting),
+            key=lambda term: term[0]
+        )
+        scores = {}
+        budget = self.max_postings
+        for df, query_tf, posting in terms:
+            if budget <= 0:
+                break
+            budget -= df
+            weight = math.log(1 + (n - df + 0.5) / (df + 0.5)) * query_tf * (self.k1 + 1)
+            for entry_id, tf in posting.items():
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight * tf / (tf + c1 + c2 * lengths[entry_id])
+        return heapq.nlargest(self.candidates, scores, key=scores.get)
+
+    @staticmethod
+    def _cosine(index, a, b):
+        weights = {gram: index.idf(gram) for gram in a.keys() | b.keys()}
+        dot = sum(tf * b[gram] * weights[gram] ** 2 for gram, tf in a.items() if gram in b)
+        norm_a = math.sqrt(sum((tf * weights[gram]) ** 2 for gram, tf in a.items()))
+        norm_b = math.sqrt(sum((tf * weights[gram]) ** 2 for gram, tf in b.items()))
+        return dot / (norm_a * norm_b) if norm_a and norm_b else 0.0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions
+            }
@@ -0,0 +1,188 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+
+
+class QuotaExceeded(Exception):
+    """Raised instead of calling Gemini when the request budget has no token left.
+
+    scope is 'deployment' when the models' shared budget is spent and
+    'client' when one client has used up its own share. The message carries
+    429 so callers treat it like Gemini's own rate limit error.
+    """
+
+    def __init__(self, scope, retry_after):
+        self.scope = scope
+        self.retry_after = retry_after
+        super().__init__(f"429 Gemini request budget exhausted ({scope}), retry in {math.ceil(retry_after)}s")
+
+
+class SharedQuota:
+    """Token buckets for Gemini requests, shared by all worker processes through a local SQLite file.
+
+    Each model has its own bucket, as Gemini's quotas are per model,
+    refilled at rpm requests per minute and holding at most burst tokens,
+    so the deployment stays under every model's quota however many workers
+    there are. Traffic spread over n models can add up to n x rpm.
+
+    A 429 seen by any worker empties that model's bucket, pauses it for
+    cooldown seconds and halves its rate, which then climbs back to rpm
+    over recovery seconds: all workers slow down together and traffic
+    resumes a token at a time instead of every worker retrying at once.
+
+    Each client also has a bucket, refilled at client_rpm, charged once per
+    request that reaches the model, so one heavy user cannot drain the
+    shared budget.
+    """
+
+    def __init__(self, path, rpm, burst=None, client_rpm=None, client_burst=None,
+                 cooldown=5.0, recovery=120.0, min_rate_factor=0.1, client_idle_ttl=600):
+        self.path = path
+        self.rpm = rpm
+        self.burst = burst or max(1, rpm // 6)
+        self.client_rpm = client_rpm or max(1, rpm // 4)
+        self.client_burst = client_burst or max(1, self.client_rpm // 6)
+        self.cooldown = cooldown
+        self.recovery = recovery
+        self.min_rate_factor = min_rate_factor
+        self.client_idle_ttl = client_idle_ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self.granted = 0
+        self.denied = 0
+        self.rate_limited = 0
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, '
+                'rate_factor REAL NOT NULL, penalized_at REAL, blocked_until REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _rate_factor(self, rate_factor, penalized_at, now):
+        """Share of the full rate a bucket is allowed right now, recovering linearly after a 429"""
+        if penalized_at is None:
+            return rate_factor
+        return min(1.0, rate_factor + (now - penalized_at) / self.recovery)
+
+    @staticmethod
+    def _refill_seconds(row, now):
+        # Nothing accrues while a bucket is paused after a 429
+        return max(0.0, now - max(row[1], row[4]))
+
+    def _update(self, key, rpm, capacity, change):
+        """Refill key's bucket, apply change(tokens, factor, row, now) and store the result.
+
+        Runs in one IMMEDIATE transaction, so concurrent workers see each
+        other's updates. change returns (tokens, row fields to store, result).
+        """
+        conn = self._connection()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT tokens, updated_at, rate_factor, penalized_at, blocked_until FROM buckets WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                row = (float(capacity), now, 1.0, None, 0.0)
+            factor = self._rate_factor(row[2], row[3], now)
+            tokens = min(capacity, row[0] + self._refill_seconds(row, now) * rpm * factor / 60)
+            tokens, fields, result = change(tokens, factor, row, now)
+            conn.execute(
+                'INSERT OR REPLACE INTO buckets '
+                '(key, tokens, updated_at, rate_factor, penalized_at, blocked_until) VALUES (?, ?, ?, ?, ?, ?)',
+                (key, tokens, now) + fields
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return result
+
+    def _take(self, key, rpm, capacity):
+        """Take one token from key's bucket. Returns 0 if taken, else the seconds until one is available"""
+        def change(tokens, factor, row, now):
+            fields = (row[2], row[3], row[4])
+            rate = rpm * factor / 60
+            if now < row[4]:
+                return tokens, fields, row[4] - now + max(0.0, 1 - tokens) / rate
+            if tokens >= 1:
+                return tokens - 1, fields, 0.0
+            return tokens, fields, (1 - tokens) / rate
+
+        wait = self._update(key, rpm, capacity, change)
+        if wait:
+            self.denied += 1
+        else:
+            self.granted += 1
+        return wait
+
+    def acquire(self, model_name):
+        """Reserve one request to model_name. Returns 0 if reserved, else the seconds to wait"""
+        return self._take(f"model:{model_name}", self.rpm, self.burst)
+
+    def admit_client(self, client):
+        """Charge one model request to client's share, or raise QuotaExceeded('client')"""
+        self._purge_idle_clients()
+        wait = self._take(f"client:{client}", self.client_rpm, self.client_burst)
+        if wait:
+            raise QuotaExceeded('client', wait)
+
+    def report_rate_limited(self, model_name):
+        """Record a 429 from model_name: empty its bucket, pause it and halve its rate"""
+        def change(tokens, factor, row, now):
+            factor = max(self.min_rate_factor, factor / 2)
+            return 0.0, (factor, now, max(row[4], now + self.cooldown)), None
+
+        self.rate_limited += 1
+        self._update(f"model:{model_name}", self.rpm, self.burst, change)
+
+    def _purge_idle_clients(self):
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        self._connection().execute(
+            "DELETE FROM buckets WHERE key LIKE 'client:%' AND updated_at < ?",
+            (now - self.client_idle_ttl,)
+        )
+
+    def state(self, model_name):
+        """Current tokens, effective requests per minute and pause for one model"""
+        row = self._connection().execute(
+            'SELECT tokens, updated_at, rate_factor, penalized_at, blocked_until FROM buckets WHERE key = ?',
+            (f"model:{model_name}",)
+        ).fetchone()
+        if row is None:
+            return {'tokens': float(self.burst), 'rpm': self.rpm, 'paused_seconds': 0.0}
+        now = time.time()
+        factor = self._rate_factor(row[2], row[3], now)
+        return {
+            'tokens': round(min(self.burst, row[0] + self._refill_seconds(row, now) * self.rpm * factor / 60), 2),
+            'rpm': round(self.rpm * factor, 1),
+            'paused_seconds': round(max(0.0, row[4] - now), 2)
+        }
+
+    def stats(self):
+        """Counters for this worker process; bucket state is in state()"""
+        return {
+            'rpm': self.rpm,
+            'burst': self.burst,
+            'client_rpm': self.client_rpm,
+            'client_burst': self.client_burst,
+            'granted': self.granted,
+            'denied': self.denied,
+            'rate_limited': self.rate_limited
+        }
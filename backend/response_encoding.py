@@ -0,0 +1,143 @@
+import json
+import zlib
+
+try:
+    import brotli
+except ImportError:  # optional: without it responses are gzip-only
+    brotli = None
+
+# Fields kept by Prefer: return=minimal. Everything a client needs to show
+# an answer, continue the session or poll a job; suggestions, languages,
+# scam categories and tracebacks are dropped.
+MINIMAL_FIELDS = frozenset([
+    'response', 'status', 'session_id', 'session_reset', 'scam_detected', 'error', 'code',
+    'job_id', 'poll_url', 'retry_after', 'attempts',
+    'delta', 'results', 'items', 'failed', 'index', 'id'
+])
+
+
+def _accepted(accept_encoding):
+    """{coding: q} from an Accept-Encoding header"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding] = q
+    return accepted
+
+
+def negotiate_encoding(accept_encoding, streaming=False):
+    """Pick 'br' or 'gzip' for the client's Accept-Encoding, or None to send identity.
+
+    Brotli wins for whole bodies. Streams flushed after every event come
+    out smaller and cheaper with gzip (see bench_compression.py), so it
+    wins ties there.
+    """
+    accepted = _accepted(accept_encoding)
+    wildcard = accepted.get('*', 0.0)
+    candidates = (['br'] if brotli is not None else []) + ['gzip']
+    if streaming:
+        candidates.reverse()
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class Compressor:
+    """Incremental gzip/brotli encoder.
+
+    compress() flushes after every chunk, so each streamed event reaches
+    the client right away while later events still benefit from the
+    shared compression context.
+    """
+
+    def __init__(self, encoding, gzip_level=6, brotli_quality=5):
+        self.encoding = encoding
+        if encoding == 'br':
+            self._encoder = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._encoder = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, chunk, flush=True):
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        if self.encoding == 'br':
+            data = self._encoder.process(chunk)
+            return data + self._encoder.flush() if flush else data
+        data = self._encoder.compress(chunk)
+        return data + self._encoder.flush(zlib.Z_SYNC_FLUSH) if flush else data
+
+    def finish(self):
+        return self._encoder.finish() if self.encoding == 'br' else self._encoder.flush()
+
+
+def compress(data, encoding, gzip_level=6, brotli_quality=5):
+    """Encode a whole body at once"""
+    compressor = Compressor(encoding, gzip_level, brotli_quality)
+    return compressor.compress(data, flush=False) + compressor.finish()
+
+
+def encode_chunks(chunks, fields=None, compressor=None):
+    """Trim and/or compress a streamed body chunk by chunk"""
+    for chunk in chunks:
+        if fields is not None:
+            chunk = compact_chunk(chunk, fields)
+        if compressor is not None:
+            chunk = compressor.compress(chunk)
+        if chunk:
+            yield chunk
+    if compressor is not None:
+        yield compressor.finish()
+
+
+def requested_fields(fields_param, prefer_header):
+    """Fields the client asked for with ?fields=a,b or Prefer: return=minimal; None means all"""
+    if fields_param:
+        return frozenset(f.strip() for f in fields_param.split(',') if f.strip()) | {'status'}
+    if prefer_header and 'return=minimal' in prefer_header.replace(' ', '').lower():
+        return MINIMAL_FIELDS
+    return None
+
+
+def compact_body(body, fields):
+    """Keep only the requested top-level fields, also inside batch 'results' items"""
+    if not isinstance(body, dict):
+        return body
+    compact = {k: v for k, v in body.items() if k in fields}
+    if isinstance(compact.get('results'), list):
+        compact['results'] = [compact_body(item, fields | {'index', 'code', 'id'}) for item in compact['results']]
+    return compact
+
+
+def compact_chunk(chunk, fields):
+    """compact_body for each JSON payload in an NDJSON line or SSE event"""
+    if isinstance(chunk, bytes):
+        chunk = chunk.decode('utf-8')
+    lines = []
+    for line in chunk.split('\n'):
+        prefix = 'data: ' if line.startswith('data: ') else ''
+        payload = line[len(prefix):]
+        if payload.startswith('{'):
+            try:
+                line = prefix + dump_compact(compact_body(json.loads(payload), fields))
+            except ValueError:
+                pass
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def dump_compact(body):
+    """JSON without whitespace and with UTF-8 text instead of \\u escapes"""
+    return json.dumps(body, ensure_ascii=False, separators=(',', ':'))
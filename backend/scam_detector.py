@@ -0,0 +1,146 @@
+from bisect import bisect_left
+
+from phrase_matcher import PhraseMatcher
+
+# Scam rules by category. Each rule is a sequence of steps that must appear
+# in this order in the message (like 'give.*otp'); a step is a phrase or a
+# tuple of alternative phrases. A trailing '*' lets a phrase take suffixes.
+# Hindi and Bengali rules follow the verb-final word order of those languages.
+# "Account blocked" and "KYC update" are everyday questions on their own, so
+# those rules also need a pressure or instruction cue (a link, an OTP,
+# "immediately") after them.
+#
+# The same goes for "send money", "share the PIN" and "bank details" in
+# Hindi and Bengali: "बेटे को पैसे कैसे भेजें?" is a help question. Those
+# rules need a pressure cue or someone else asking ("तुरंत", a link, "...को
+# कहा", "চাইছে"), which may come before, between or after the two steps.
+HI_PRESSURE = ('तुरंत', 'लिंक', 'link*', 'कहा', 'कह रहा', 'कह रही', 'मांग*', 'माँग*')
+BN_PRESSURE = ('এখনই', 'লিংক', 'link*', 'বলেছে', 'বলছে', 'চাইছে', 'চেয়েছে', 'চাচ্ছে')
+
+
+def with_cue(noun, verb, cue):
+    """The rule noun → verb with the cue before, between or after its steps"""
+    return [(cue, noun, verb), (noun, cue, verb), (noun, verb, cue)]
+
+
+SCAM_RULES = {
+    'money_request': [
+        ('send money',),
+        ('transfer*', 'urgent*'),
+        ('lottery', ('won', 'win*')),
+        ('prince', 'nigeria*'),
+        ('inheritance', 'claim*'),
+        *with_cue(('पैसे', 'पैसा', 'रुपये'), ('भेज*', 'ट्रांसफर'), HI_PRESSURE),
+        (('लॉटरी', 'इनाम'), ('जीत*', 'लगी', 'लगा')),
+        *with_cue(('টাকা',), ('পাঠান', 'পাঠাও', 'পাঠাবেন', 'ট্রান্সফার'), BN_PRESSURE),
+        (('লটারি', 'পুরস্কার'), ('জিতেছ*', 'জিতেছেন')),
+    ],
+    'phishing_link': [
+        ('click*', 'link*'),
+        ('verif*', 'account*', 'immediately'),
+        ('suspend*', 'account*'),
+        ('account*', ('suspend*', 'block*'), ('link*', 'otp', 'immediately', 'urgent*')),
+        ('लिंक', ('क्लिक', 'दबाएं', 'दबाओ', 'खोलें')),
+        (('खाता', 'अकाउंट'), ('बंद', 'ब्लॉक'), ('लिंक', 'ओटीपी', 'otp', 'तुरंत', 'link*')),
+        (('केवाईसी', 'kyc'), ('अपडेट', 'update*'), ('लिंक', 'ओटीपी', 'otp', 'तुरंत', 'link*')),
+        ('লিংক', ('ক্লিক', 'খুলুন')),
+        (('অ্যাকাউন্ট', 'অ্যাকাউন্টটি'), ('বন্ধ', 'ব্লক'), ('লিংক', 'ওটিপি', 'otp', 'এখনই', 'link*')),
+    ],
+    'credential_request': [
+        ('give*', 'otp'),
+        ('share*', ('pin', 'pins')),
+        ('tell*', 'password*'),
+        ('bank*', 'detail*'),
+        *with_cue(('ओटीपी', 'otp', 'पिन', 'पासवर्ड'), ('शेयर', 'भेज*'), HI_PRESSURE),
+        (('ओटीपी', 'otp', 'पिन', 'पासवर्ड'), ('मांग*', 'माँग*')),
+        *with_cue('बैंक', ('डिटेल*', 'विवरण'), HI_PRESSURE),
+        *with_cue(('ওটিপি', 'otp', 'পিন', 'পাসওয়ার্ড'), ('শেয়ার', 'পাঠান'), BN_PRESSURE),
+        (('ওটিপি', 'otp', 'পিন', 'পাসওয়ার্ড'), ('চাইছে', 'চেয়েছে', 'চাচ্ছে')),
+        *with_cue('ব্যাংক', ('ডিটেলস', 'বিবরণ'), BN_PRESSURE),
+    ],
+    'guaranteed_returns': [
+        ('invest*', 'guarantee*'),
+        ('doubl*', 'money'),
+        ('risk*', 'free', 'profit*'),
+        (('पैसे', 'पैसा', 'रकम'), 'दोगुना'),
+        ('गारंटी*', ('रिटर्न', 'मुनाफा', 'फायदा')),
+        ('টাকা', 'দ্বিগুণ'),
+        ('গ্যারান্টি*', ('লাভ', 'রিটার্ন')),
+    ],
+    'crypto_scheme': [
+        ('crypto*', 'mining'),
+        ('bitcoin*', 'invest*'),
+        ('forex', 'trading', 'sure*'),
+        (('क्रिप्टो', 'बिटकॉइन'), ('निवेश', 'इन्वेस्ट*', 'माइनिंग')),
+        (('ক্রিপ্টো', 'বিটকয়েন'), ('বিনিয়োগ', 'মাইনিং')),
+    ],
+}
+
+
+class ScamDetector:
+    """Single-pass multilingual scam detector.
+
+    Every phrase used by any rule is compiled into one Aho-Corasick
+    automaton, so a message is scanned once in linear time. Rules are then
+    checked against the phrase hits by picking, for each step, the earliest
+    occurrence that starts after the previous step ended.
+    """
+
+    def __init__(self, rules=SCAM_RULES):
+        phrases = []
+        phrase_ids = {}
+
+        def phrase_id(phrase):
+            if phrase not in phrase_ids:
+                phrase_ids[phrase] = len(phrases)
+                phrases.append(phrase)
+            return phrase_ids[phrase]
+
+        self._rules = []
+        for category, sequences in rules.items():
+            for sequence in sequences:
+                steps = []
+                for step in sequence:
+                    alternatives = (step,) if isinstance(step, str) else step
+                    steps.append([phrase_id(p) for p in alternatives])
+                self._rules.append((category, steps))
+        self._matcher = PhraseMatcher(phrases)
+
+    def detect(self, message):
+        """Return the scam categories that fired for the message, in rule order"""
+        hits = {}
+        for phrase_id, start, end in self._matcher.find_all(message):
+            hits.setdefault(phrase_id, []).append((start, end))
+        if not hits:
+            return []
+        for positions in hits.values():
+            positions.sort()
+
+        categories = []
+        for category, steps in self._rules:
+            if category in categories:
+                continue
+            if self._sequence_matches(steps, hits):
+                categories.append(category)
+        return categories
+
+    @staticmethod
+    def _sequence_matches(steps, hits):
+        position = 0
+        for alternatives in steps:
+            best_end = None
+            for phrase_id in alternatives:
+                positions = hits.get(phrase_id)
+                if not positions:
+                    continue
+                # Occurrences of one phrase share a length, so the first one
+                # starting at or after position also ends first
+                i = bisect_left(positions, (position, -1))
+                if i < len(positions):
+                    end = positions[i][1]
+                    if best_end is None or end < best_end:
+                        best_end = end
+            if best_end is None:
+                return False
+            position = best_end
+        return True
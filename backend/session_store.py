@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+class SessionExpired(Exception):
+    """A request names a session the store no longer has and sent no chat_history to rebuild it from"""
+
+    def __init__(self, session_id):
+        super().__init__("Session not found or expired. Send the message again with chat_history.")
+        self.session_id = session_id
+
+
+class MemorySessionStore:
+    """In-process conversation sessions with LRU and idle-time eviction.
+
+    Each session keeps the last max_messages {'sender', 'message'} turns.
+    Suitable for a single worker; use SQLiteSessionStore when several
+    gunicorn workers must see the same sessions.
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=3600, max_messages=50):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, session_id):
+        """Return the session's messages, or None if it is unknown or idle too long"""
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            messages, last_access = entry
+            if time.monotonic() - last_access > self.idle_ttl:
+                del self._sessions[session_id]
+                self.evictions += 1
+                return None
+            self._sessions[session_id] = (messages, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return list(messages)
+
+    def create(self, messages=None):
+        """Start a session, optionally seeded with client-side history, and return its id"""
+        session_id = new_session_id()
+        with self._lock:
+            self._sessions[session_id] = ((messages or [])[-self.max_messages:], time.monotonic())
+            self._evict()
+        return session_id
+
+    def append(self, session_id, messages):
+        """Add turns to a session, recreating it if it was evicted meanwhile"""
+        with self._lock:
+            existing = self._sessions.get(session_id, ([], None))[0]
+            self._sessions[session_id] = ((existing + messages)[-self.max_messages:], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            self._evict()
+
+    def _evict(self):
+        now = time.monotonic()
+        # Oldest entries come first, so idle sessions are found at the front
+        while self._sessions:
+            session_id, (_, last_access) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - last_access <= self.idle_ttl:
+                break
+            del self._sessions[session_id]
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'backend': 'memory',
+                'sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'evictions': self.evictions
+            }
+
+
+class SQLiteSessionStore:
+    """Conversation sessions in a local SQLite file shared by all worker processes"""
+
+    def __init__(self, path, idle_ttl=3600, max_messages=50):
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self._local = threading.local()
+        self._last_purge = 0.0
+
+    def _connection(self):
+        # One connection per thread and process; connections must not cross a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS sessions ('
+                'id TEXT PRIMARY KEY, messages TEXT NOT NULL, updated_at REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)')
+            conn.commit()
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id):
+        conn = self._connection()
+        row = conn.execute(
+            'SELECT messages, updated_at FROM sessions WHERE id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        if time.time() - row[1] > self.idle_ttl:
+            with conn:
+                conn.execute('DELETE FROM sessions WHERE id = ?', (session_id,))
+            return None
+        return json.loads(row[0])
+
+    def create(self, messages=None):
+        session_id = new_session_id()
+        self._write(session_id, (messages or [])[-self.max_messages:])
+        return session_id
+
+    def append(self, session_id, messages):
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent appends
+        # from other workers cannot interleave between the read and the write
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT messages FROM sessions WHERE id = ?', (session_id,)).fetchone()
+            existing = json.loads(row[0]) if row else []
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, messages, updated_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps((existing + messages)[-self.max_messages:], ensure_ascii=False), time.time())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._purge_idle()
+
+    def _write(self, session_id, messages):
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO sessions (id, messages, updated_at) VALUES (?, ?, ?)',
+                (session_id, json.dumps(messages, ensure_ascii=False), time.time())
+            )
+        self._purge_idle()
+
+    def _purge_idle(self):
+        # Idle sessions are swept at most once a minute
+        now = time.time()
+        if now - self._last_purge < 60:
+            return
+        self._last_purge = now
+        conn = self._connection()
+        with conn:
+            conn.execute('DELETE FROM sessions WHERE updated_at < ?', (now - self.idle_ttl,))
+
+    def stats(self):
+        count = self._connection().execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+        return {
+            'backend': 'sqlite',
+            'sessions': count,
+            'path': self.path
+        }
+
+
+def create_session_store():
+    """Pick the session backend from SESSION_STORE ('memory' or 'sqlite')"""
+    idle_ttl = int(os.getenv('SESSION_IDLE_TTL', 3600))
+    max_messages = int(os.getenv('SESSION_MAX_MESSAGES', 50))
+    if os.getenv('SESSION_STORE', 'memory').lower() == 'sqlite':
+        return SQLiteSessionStore(
+            os.getenv('SESSION_DB_PATH', 'sessions.db'),
+            idle_ttl=idle_ttl,
+            max_messages=max_messages
+        )
+    return MemorySessionStore(
+        max_sessions=int(os.getenv('SESSION_MAX_SESSIONS', 10000)),
+        idle_ttl=idle_ttl,
+        max_messages=max_messages
+    )
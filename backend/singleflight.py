@@ -0,0 +1,111 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """Collapse concurrent calls for the same key into one execution.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is in flight wait for and share its result or error.
+    With an executor the function runs there instead of on the leader's
+    thread, so every caller, leader included, can give up after timeout
+    while the call finishes in the background.
+    """
+
+    def __init__(self, executor=None):
+        self.executor = executor
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+
+    def do(self, key, fn, timeout=None):
+        """Return fn() for this key, sharing one execution among concurrent callers.
+
+        Raises concurrent.futures.TimeoutError if timeout elapses first
+        (without an executor only callers that joined another's call wait).
+        """
+        return self.start(key, fn).result(timeout)
+
+    def start(self, key, fn):
+        """Start or join the execution for this key and return its Future without waiting.
+
+        Only runs in the background with an executor; without one fn runs
+        on the calling thread before this returns.
+        """
+        with self._lock:
+            self.calls += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.executions += 1
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.shared += 1
+
+        if leader:
+            if self.executor is not None:
+                self.executor.submit(self._run, key, future, fn)
+            else:
+                self._run(key, future, fn)
+        return future
+
+    def _run(self, key, future, fn):
+        try:
+            result = fn()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+        else:
+            with self._lock:
+                del self._inflight[key]
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'calls': self.calls,
+                'executions': self.executions,
+                'shared': self.shared,
+                'in_flight': len(self._inflight)
+            }
+
+
+class AsyncSingleFlight:
+    """asyncio counterpart of SingleFlight for coroutine functions"""
+
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key, fn, timeout=None):
+        """Await fn() for this key, sharing one execution among concurrent callers.
+
+        Raises TimeoutError if timeout elapses first; the call goes on for
+        the other callers.
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.shared += 1
+        # shield() so one caller being cancelled does not cancel the shared call
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+    def stats(self):
+        return {
+            'calls': self.calls,
+            'executions': self.executions,
+            'shared': self.shared,
+            'in_flight': len(self._inflight)
+        }
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import queue
+import random
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+logger = logging.getLogger('finstra')
+logger.propagate = False
+
+_sample_rate = 1.0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, event name and the event's fields"""
+
+    def format(self, record):
+        entry = {'ts': round(record.created, 3), 'level': record.levelname.lower(), 'event': record.msg}
+        entry.update(getattr(record, 'fields', {}))
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class BackgroundHandler(QueueHandler):
+    """Hand records to a listener thread that formats and writes them.
+
+    The request thread only appends to an in-memory queue. Records are
+    passed through unformatted (the queue never leaves the process) and are
+    dropped, not blocked on, when the queue is full.
+    """
+
+    def __init__(self, target, max_queue=10000):
+        super().__init__(queue.Queue(max_queue))
+        self.target = target
+        self.max_queue = max_queue
+        self.dropped = 0
+        self._pid = None
+        self._listener = None
+        self._start_lock = threading.Lock()
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        self._ensure_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_listener(self):
+        # Threads do not survive a fork, so each worker process starts its own listener
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self.queue = queue.Queue(self.max_queue)
+            self._listener = QueueListener(self.queue, self.target)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def flush(self):
+        """Write out everything queued so far (used at exit)"""
+        if self._listener is not None and self._pid == os.getpid():
+            self._listener.stop()
+            self._pid = None
+
+
+def configure_logging(sample_rate=1.0, level='INFO'):
+    """Route the 'finstra' logger through a background JSON-lines writer on stderr.
+
+    sample_rate is the share of sampled (per-request) events that are kept;
+    warnings, errors and unsampled events are always written.
+    """
+    global _sample_rate
+    _sample_rate = sample_rate
+    logger.setLevel(level)
+    if not any(isinstance(h, BackgroundHandler) for h in logger.handlers):
+        target = logging.StreamHandler()
+        target.setFormatter(JsonFormatter())
+        logger.addHandler(BackgroundHandler(target))
+
+
+def log_event(event, level=logging.INFO, sample=False, **fields):
+    """Log a structured event; sample=True keeps only a sample_rate share of them"""
+    if sample and level < logging.WARNING and random.random() >= _sample_rate:
+        return
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+
+def logging_stats():
+    handlers = [h for h in logger.handlers if isinstance(h, BackgroundHandler)]
+    return {
+        'sample_rate': _sample_rate,
+        'dropped': sum(h.dropped for h in handlers)
+    }
@@ -0,0 +1,124 @@
+"""Local stand-ins for Gemini models and SerpAPI, for exercising the backend offline.
+
+StubModel answers generate_content / generate_content_async like a
+google.generativeai GenerativeModel, after a simulated latency, and raises
+a 429-style error for a configurable share of calls. StubSerpAPI takes
+the place of serpapi.Client.
+"""
+import asyncio
+import random
+import threading
+import time
+
+
+class StubRateLimitError(Exception):
+    def __init__(self, model_name):
+        super().__init__(f"429 Resource has been exhausted (stub model {model_name})")
+
+
+class StubResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubModel:
+    """Fake GenerativeModel with configurable latency, tail latency and 429 rate"""
+
+    def __init__(self, model_name='models/stub', latency=0.2, jitter=0.05,
+                 slow_ratio=0.0, slow_latency=3.0, rate_limit_ratio=0.0,
+                 response_chars=800, seed=None):
+        self._model_name = model_name
+        self.latency = latency
+        self.jitter = jitter
+        self.slow_ratio = slow_ratio
+        self.slow_latency = slow_latency
+        self.rate_limit_ratio = rate_limit_ratio
+        self.response_chars = response_chars
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _plan_call(self):
+        """Pick this call's delay and whether it is rate limited"""
+        with self._lock:
+            self.calls += 1
+            if self._random.random() < self.slow_ratio:
+                delay = self.slow_latency
+            else:
+                delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            return delay, self._random.random() < self.rate_limit_ratio
+
+    def _text(self, prompt):
+        paragraph = (
+            f"Namaste! This is a stub answer from {self._model_name}. "
+            "Saving a little every week is like storing grain after harvest.\n\n"
+        )
+        text = paragraph * (self.response_chars // len(paragraph) + 1)
+        return text[:self.response_chars]
+
+    def _chunks(self, text, size=80):
+        return [StubResponse(text[i:i + size]) for i in range(0, len(text), size)]
+
+    def generate_content(self, prompt, stream=False, **kwargs):
+        delay, rate_limited = self._plan_call()
+        time.sleep(delay)
+        if rate_limited:
+            raise StubRateLimitError(self._model_name)
+        text = self._text(prompt)
+        return iter(self._chunks(text)) if stream else StubResponse(text)
+
+    async def generate_content_async(self, prompt, stream=False, **kwargs):
+        delay, rate_limited = self._plan_call()
+        await asyncio.sleep(delay)
+        if rate_limited:
+            raise StubRateLimitError(self._model_name)
+        text = self._text(prompt)
+        if not stream:
+            return StubResponse(text)
+
+        async def chunks():
+            for chunk in self._chunks(text):
+                yield chunk
+        return chunks()
+
+
+class StubHTTPResponse:
+    def __init__(self, data):
+        self._data = data
+
+    def json(self):
+        return self._data
+
+
+class StubSerpAPI:
+    """Fake serpapi.Client returning an answer box after a simulated latency.
+
+    request() honours a timeout like requests does, raising once it has
+    waited that long.
+    """
+
+    def __init__(self, latency=0.5, jitter=0.2, error_ratio=0.0, seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_ratio = error_ratio
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def search(self, params):
+        return self.request('GET', '/search', params).json()
+
+    def request(self, method, path, params, timeout=None):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_ratio
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"stub SerpAPI read timed out ({timeout}s)")
+        time.sleep(delay)
+        if failed:
+            raise RuntimeError("stub SerpAPI error")
+        return StubHTTPResponse(
+            {'answer_box': {'snippet': f"Stub result for '{params.get('q', '')}': rates unchanged today."}}
+        )
@@ -0,0 +1,60 @@
+"""Tests for server-side chat sessions: an expired session must not silently lose the conversation.
+
+Usage: python -m unittest test_chat_sessions
+"""
+import os
+import unittest
+
+os.environ.setdefault('GEMINI_API_KEY', 'test-chat-sessions-key')
+os.environ.setdefault('LOG_LEVEL', 'CRITICAL')
+
+import app as finstra
+from model_router import ModelRouter
+from stub_models import StubModel
+
+
+class ChatSessionTest(unittest.TestCase):
+
+    def setUp(self):
+        finstra.model = ModelRouter([StubModel('models/stub', latency=0.0, jitter=0.0)])
+        self.client = finstra.app.test_client()
+
+    def test_known_session_continues(self):
+        first = self.client.post('/api/py/chat', json={'message': 'What is a fixed deposit?'}).get_json()
+        response = self.client.post('/api/py/chat', json={
+            'message': 'And for five years?', 'session_id': first['session_id']
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['session_id'], first['session_id'])
+
+    def test_unknown_session_without_history_asks_for_it(self):
+        response = self.client.post('/api/py/chat', json={
+            'message': 'And for five years?', 'session_id': 'expired-session'
+        })
+        self.assertEqual(response.status_code, 409)
+        self.assertTrue(response.get_json()['session_reset'])
+
+        stream = self.client.post('/api/py/chat/stream', json={
+            'message': 'And for five years?', 'session_id': 'expired-session'
+        }).get_data(as_text=True)
+        self.assertIn('event: error', stream)
+        self.assertIn('"session_reset": true', stream)
+
+    def test_unknown_session_with_history_starts_a_new_one(self):
+        response = self.client.post('/api/py/chat', json={
+            'message': 'And for five years?',
+            'session_id': 'expired-session',
+            'chat_history': [
+                {'sender': 'user', 'message': 'What is a fixed deposit?'},
+                {'sender': 'bot', 'message': 'A fixed deposit locks money for a fixed term.'},
+                {'sender': 'user', 'message': 'And for five years?'},
+            ]
+        })
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(body['session_id'], 'expired-session')
+        self.assertEqual(len(finstra.session_store.get(body['session_id'])), 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+"""Regression tests for ScamDetector: help questions must not be flagged as scams.
+
+Usage: python -m unittest test_scam_detector
+"""
+import unittest
+
+from scam_detector import ScamDetector
+
+
+class ScamDetectorTest(unittest.TestCase):
+    detector = ScamDetector()
+
+    def test_help_questions_are_not_flagged(self):
+        questions = [
+            "बेटे को पैसे कैसे भेजें?",
+            "पैसे भेजने का सबसे सस्ता तरीका क्या है?",
+            "ছেলেকে টাকা কিভাবে পাঠান যায়?",
+            "UPI पिन कैसे बदलें? बताइए",
+            "ओटीपी क्या होता है बताइए",
+            "UPI पिन सेट करने के दो तरीके",
+            "नया एटीएम पिन आने में कितने दिन लगते हैं, बताइए",
+            "নতুন এটিএম পিন পেতে কত দিন লাগে?",
+            "मुझे बैंक खाते का विवरण कैसे मिलेगा",
+        ]
+        for question in questions:
+            with self.subTest(question=question):
+                self.assertEqual(self.detector.detect(question), [])
+
+    def test_pressure_or_third_party_cue_is_flagged(self):
+        messages = {
+            "इस लिंक पर पैसे भेजें": 'money_request',
+            "उसने मुझे पैसे भेजने को कहा": 'money_request',
+            "এখনই টাকা পাঠান": 'money_request',
+            "अपना ओटीपी तुरंत शेयर करें": 'credential_request',
+            "कोई मेरा ओटीपी मांग रहा है": 'credential_request',
+            "ও আমার ওটিপি চাইছে": 'credential_request',
+            "आपकी बैंक डिटेल तुरंत भेजो": 'credential_request',
+        }
+        for message, category in messages.items():
+            with self.subTest(message=message):
+                self.assertIn(category, self.detector.detect(message))
+
+
+if __name__ == '__main__':
+    unittest.main()
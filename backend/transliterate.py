@@ -0,0 +1,119 @@
+import re
+import unicodedata
+
+# Rough phonetic romanization of Devanagari and Bengali, enough for users'
+# own transliterations ("paise kaise bachaye" for "पैसे कैसे बचाएं") to
+# share character n-grams with the native script. It is not a reversible
+# scheme: aspirates, vowel lengths and nasals are folded the way people
+# commonly type them.
+
+_DEVANAGARI_CONSONANTS = {
+    'क': 'k', 'ख': 'kh', 'ग': 'g', 'घ': 'gh', 'ङ': 'n',
+    'च': 'ch', 'छ': 'chh', 'ज': 'j', 'झ': 'jh', 'ञ': 'n',
+    'ट': 't', 'ठ': 'th', 'ड': 'd', 'ढ': 'dh', 'ण': 'n',
+    'त': 't', 'थ': 'th', 'द': 'd', 'ध': 'dh', 'न': 'n',
+    'प': 'p', 'फ': 'f', 'ब': 'b', 'भ': 'bh', 'म': 'm',
+    'य': 'y', 'र': 'r', 'ल': 'l', 'व': 'v', 'श': 'sh',
+    'ष': 'sh', 'स': 's', 'ह': 'h', 'ळ': 'l',
+}
+_DEVANAGARI_VOWELS = {
+    'अ': 'a', 'आ': 'a', 'इ': 'i', 'ई': 'i', 'उ': 'u', 'ऊ': 'u', 'ऋ': 'ri',
+    'ए': 'e', 'ऐ': 'ai', 'ओ': 'o', 'औ': 'au', 'ऑ': 'o',
+}
+_DEVANAGARI_SIGNS = {
+    'ा': 'a', 'ि': 'i', 'ी': 'i', 'ु': 'u', 'ू': 'u', 'ृ': 'ri',
+    'े': 'e', 'ै': 'ai', 'ो': 'o', 'ौ': 'au', 'ॅ': 'e', 'ॉ': 'o',
+}
+
+_BENGALI_CONSONANTS = {
+    'ক': 'k', 'খ': 'kh', 'গ': 'g', 'ঘ': 'gh', 'ঙ': 'ng',
+    'চ': 'ch', 'ছ': 'chh', 'জ': 'j', 'ঝ': 'jh', 'ঞ': 'n',
+    'ট': 't', 'ঠ': 'th', 'ড': 'd', 'ঢ': 'dh', 'ণ': 'n',
+    'ত': 't', 'থ': 'th', 'দ': 'd', 'ধ': 'dh', 'ন': 'n',
+    'প': 'p', 'ফ': 'f', 'ব': 'b', 'ভ': 'bh', 'ম': 'm',
+    'য': 'j', 'র': 'r', 'ল': 'l', 'শ': 'sh', 'ষ': 'sh',
+    'স': 's', 'হ': 'h', 'ৎ': 't',
+}
+_BENGALI_VOWELS = {
+    'অ': 'a', 'আ': 'a', 'ই': 'i', 'ঈ': 'i', 'উ': 'u', 'ঊ': 'u', 'ঋ': 'ri',
+    'এ': 'e', 'ঐ': 'oi', 'ও': 'o', 'ঔ': 'ou',
+}
+_BENGALI_SIGNS = {
+    'া': 'a', 'ি': 'i', 'ী': 'i', 'ু': 'u', 'ূ': 'u', 'ৃ': 'ri',
+    'ে': 'e', 'ৈ': 'oi', 'ো': 'o', 'ৌ': 'ou',
+}
+
+# Consonant + nukta pairs (NFC keeps these decomposed)
+_NUKTA_CONSONANTS = {
+    'क़': 'q', 'ख़': 'kh', 'ग़': 'g', 'ज़': 'z', 'ड़': 'r', 'ढ़': 'rh', 'फ़': 'f', 'य़': 'y',
+    'ড়': 'r', 'ঢ়': 'rh', 'য়': 'y',
+}
+NUKTA_CONSONANTS = {unicodedata.normalize('NFD', k): v for k, v in _NUKTA_CONSONANTS.items()}
+
+CONSONANTS = dict(_DEVANAGARI_CONSONANTS, **_BENGALI_CONSONANTS)
+VOWELS = dict(_DEVANAGARI_VOWELS, **_BENGALI_VOWELS)
+VOWEL_SIGNS = dict(_DEVANAGARI_SIGNS, **_BENGALI_SIGNS)
+VIRAMAS = {'्', '্'}
+NASALS = {'ं', 'ँ', 'ং', 'ঁ'}
+NUKTAS = {'़', '়'}
+
+# Spelling variants folded after romanization, for Latin input as well:
+# long vowels typed doubled, w/v and ph/f, then any doubled letter
+_FOLDS = re.compile(r'aa+|ee+|oo+|w|ph')
+_FOLD_TO = {'a': 'a', 'e': 'i', 'o': 'u', 'w': 'v', 'p': 'f'}
+_REPEATS = re.compile(r'([a-z])\1+')
+
+_INDIC_WORD = re.compile(r'[\u0900-\u097F\u0980-\u09FF]+')
+_SEPARATORS = re.compile(r'[^\w\u0900-\u097F\u0980-\u09FF]+')
+_DIGITS = {
+    ord(ch): str(unicodedata.digit(ch))
+    for start in (0x0966, 0x09E6) for ch in map(chr, range(start, start + 10))
+}
+
+
+def _romanize_word(word):
+    out = []
+    inherent = False  # whether the last consonant still carries its implicit 'a'
+    for i, ch in enumerate(word):
+        if ch in CONSONANTS:
+            if inherent:
+                out.append('a')
+            if ch == 'য' and i > 0:
+                # Bengali য is 'j' only at the start of a word ("ব্যাংক" is "byank")
+                out.append('y')
+            else:
+                out.append(NUKTA_CONSONANTS.get(word[i:i + 2], CONSONANTS[ch]))
+            inherent = True
+        elif ch in VOWEL_SIGNS:
+            out.append(VOWEL_SIGNS[ch])
+            inherent = False
+        elif ch in VIRAMAS:
+            inherent = False
+        elif ch in VOWELS:
+            if inherent:
+                out.append('a')
+            out.append(VOWELS[ch])
+            inherent = False
+        elif ch in NASALS:
+            if inherent:
+                out.append('a')
+            out.append('n')
+            inherent = False
+        elif ch in NUKTAS:
+            continue
+        else:
+            if inherent:
+                out.append('a')
+            out.append(ch)
+            inherent = False
+    # A pending inherent vowel at the end of the word is silent ("bachat", not "bachata")
+    return ''.join(out)
+
+
+def romanize(text):
+    """Lowercase Latin approximation of text, with Devanagari/Bengali romanized"""
+    text = unicodedata.normalize('NFC', text or '').lower()
+    text = _INDIC_WORD.sub(lambda m: _romanize_word(m.group()), text.translate(_DIGITS))
+    text = _SEPARATORS.sub(' ', text).strip()
+    text = _FOLDS.sub(lambda m: _FOLD_TO[m.group()[0]], text)
+    return _REPEATS.sub(r'\1', text)
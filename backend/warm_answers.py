@@ -0,0 +1,76 @@
+"""Pre-generate answers to COMMON_QUESTIONS for the answer store.
+
+Builds the chat and voice search prompts for every common question in
+every language, generates each answer once, and writes them to
+ANSWER_STORE_PATH (common_answers.json next to app.py by default), which
+app.py loads at startup. Re-run after changing the prompts and bumping
+PROMPT_VERSION; answers from an older PROMPT_VERSION are ignored.
+
+--stub uses StubModel instead of Gemini, to try the pipeline offline.
+
+Usage: python warm_answers.py [--stub] [--out PATH] [--concurrency N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def generate_with_retry(model, prompt, max_attempts, is_rate_limit_error):
+    """Generate one answer, backing off and retrying when the quota is exhausted"""
+    for attempt in range(1, max_attempts + 1):
+        try:
+            return model.generate_content(prompt).text
+        except Exception as e:
+            if not is_rate_limit_error(e) or attempt == max_attempts:
+                raise
+            time.sleep(min(60, 2 ** attempt))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pre-generate answers to the common questions")
+    parser.add_argument('--stub', action='store_true', help="use the local stub model instead of Gemini")
+    parser.add_argument('--out', help="answer file (default: ANSWER_STORE_PATH)")
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--max-attempts', type=int, default=5)
+    args = parser.parse_args(argv)
+
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    import app as finstra
+    from answer_store import write_answer_file
+
+    if args.stub:
+        from stub_models import StubModel
+        finstra.model = StubModel('models/stub', latency=0.05, jitter=0.0)
+
+    jobs = []
+    for language, questions in finstra.COMMON_QUESTIONS.items():
+        for question in questions:
+            jobs.append(('chat', language, question, finstra.build_chat_prompt(question, language, [])[0]))
+            jobs.append(('search', language, question, finstra.build_search_prompt(question, language)[0]))
+
+    def run(job):
+        kind, language, question, prompt = job
+        try:
+            text = generate_with_retry(finstra.model, prompt, args.max_attempts, finstra.is_rate_limit_error)
+        except Exception as e:
+            print(f"FAILED {kind}/{language}: {question} ({e})", file=sys.stderr)
+            return None
+        if not text:
+            print(f"EMPTY {kind}/{language}: {question}", file=sys.stderr)
+            return None
+        print(f"ok {kind}/{language}: {question}")
+        return {'kind': kind, 'language': language, 'question': question, 'answer': finstra.clean_response(text)}
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        entries = [entry for entry in pool.map(run, jobs) if entry]
+
+    path = args.out or finstra.ANSWER_STORE_PATH
+    write_answer_file(path, finstra.PROMPT_VERSION, entries, model=finstra.model._model_name)
+    print(f"Wrote {len(entries)}/{len(jobs)} answers to {path}")
+    return 0 if len(entries) == len(jobs) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -39,16 +39,23 @@ const Page: React.FC = () => {
   useEffect(() => {
     console.debug('[Chat Page] isLoading =', isLoading);
   }, [isLoading]);
+  const [commonQuestions, setCommonQuestions] = useState<Record<string, string[]>>({})
   const [suggestedQuestions, setSuggestedQuestions] = useState<string[]>([])
   const [chatInput, setChatInput] = useState<string>("");
   const [selectedLanguage, setSelectedLanguage] = useState<string>("english");
 
+  // The list holds every language, so it is fetched once; the backend sends
+  // ETag/Cache-Control so the browser can reuse it across page loads.
   useEffect(() => {
     (async () => {
       const res: AxiosResponse = await axios.get(`${baseUrl}/api/py/common-questions`)
-      setSuggestedQuestions(res.data[selectedLanguage])
+      setCommonQuestions(res.data)
     })()
-  }, [selectedLanguage])
+  }, [])
+
+  useEffect(() => {
+    setSuggestedQuestions(commonQuestions[selectedLanguage] ?? [])
+  }, [commonQuestions, selectedLanguage])
 
   const messagesEndRef = useRef<HTMLDivElement>(null)
 
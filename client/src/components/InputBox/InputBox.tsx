@@ -31,9 +31,27 @@ interface InputBoxProps {
 // Use localhost during local development. Change to deployed URL for production.
 const baseUrl = 'http://localhost:5000';
 
+// When Gemini is rate limited the backend queues the generation and answers
+// 202 with a job id; poll the job until it finishes.
+const waitForJob = async (jobId: string, retryAfter: number = 5) => {
+    let delay = retryAfter;
+    for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, delay * 1000));
+        const res: AxiosResponse = await axios.get(`${baseUrl}/api/py/jobs/${jobId}`);
+        if (res.status !== 202) {
+            return res.data;
+        }
+        delay = res.data.retry_after || retryAfter;
+    }
+};
+
 const InputBox: React.FC<InputBoxProps> = ({
     chatMessages, setChatMessages, chatInput, setChatInput, selectedLanguage, handleLanguageChange, setIsLoading }) => {
 
+    // Once the backend has issued a session id it keeps the conversation
+    // history, so only the new message needs to be uploaded.
+    const sessionIdRef = React.useRef<string | null>(null);
+
     const sendMessage = async () => {
         if (!chatInput.trim()) {
             setChatInput(chatInput.trim());
@@ -58,18 +76,45 @@ const InputBox: React.FC<InputBoxProps> = ({
                 setIsLoading(true);
             }
             const previousMessages = chatMessages.slice(-5);
-            const res: AxiosResponse = await axios.post(`${baseUrl}/api/py/chat`, {
-                message: chatInput,
-                language: selectedLanguage,
-                chat_history: [...previousMessages, userMessage]
-            });
+            const postMessage = () => axios.post(`${baseUrl}/api/py/chat`, sessionIdRef.current
+                ? {
+                    message: chatInput,
+                    language: selectedLanguage,
+                    session_id: sessionIdRef.current
+                }
+                : {
+                    message: chatInput,
+                    language: selectedLanguage,
+                    chat_history: [...previousMessages, userMessage]
+                });
+
+            let res: AxiosResponse;
+            try {
+                res = await postMessage();
+            } catch (error) {
+                // The session expired on the backend (409 session_reset):
+                // start a new one from the history kept here.
+                if (!axios.isAxiosError(error) || !error.response?.data?.session_reset) {
+                    throw error;
+                }
+                sessionIdRef.current = null;
+                res = await postMessage();
+            }
+
+            const data = res.status === 202 && res.data.job_id
+                ? await waitForJob(res.data.job_id, res.data.retry_after)
+                : res.data;
+
+            if (data.session_id) {
+                sessionIdRef.current = data.session_id;
+            }
 
             const botMessage: MessageType = {
                 sender: "bot",
-                message: res.data.response,
+                message: data.response,
                 timestamp: new Date().toISOString(),
-                suggestions: res.data.suggestions || [],
-                scam_detected: res.data.scam_detected || false
+                suggestions: data.suggestions || [],
+                scam_detected: data.scam_detected || false
             };
 
             setChatMessages((prev) => [...prev, botMessage]);